@@ -1,19 +1,213 @@
 import pygame
 import sys
 import math
+import os
 import numpy as np
+import qbert_dsp as dsp
+from collections import OrderedDict
 
-# Initialize Pygame
+# Null audio runs synthesis without a sound device, for CI, servers and benchmarks
+NULL_AUDIO = os.environ.get("QBERT_NULL_AUDIO", "0") == "1" or "--null-audio" in sys.argv
+
+# Mixer buffer size in frames - smaller buffers cut latency but underrun more easily
+MIXER_BUFFER_FRAMES = int(os.environ.get("QBERT_AUDIO_BUFFER", "512"))
+
+# Initialize Pygame - pygame.init() opens the mixer, so its settings go in first.
+# The mixer runs at the 22050 Hz everything is synthesized at; before, it opened
+# at 44100 Hz and every sound played an octave high and twice as fast.
+pygame.mixer.pre_init(frequency=22050, size=-16, channels=2, buffer=MIXER_BUFFER_FRAMES)
 pygame.init()
+if NULL_AUDIO:
+    pygame.mixer.quit()  # Null runs keep no audio device open
+
+# Audio backends: the pygame mixer, or a null backend that counts what
+# would have played and discards it
+class PygameAudioBackend:
+    def make_sound(self, samples):
+        """Turn int16 samples into a playable sound"""
+        return pygame.sndarray.make_sound(samples)
+    
+    def sound_array(self, sound):
+        """Copy a sound's samples into an array"""
+        return pygame.sndarray.array(sound)
+    
+    def channel(self, channel_num):
+        """Get a mixer channel by number"""
+        return pygame.mixer.Channel(channel_num)
+    
+    def set_num_channels(self, count):
+        """Set how many mixer channels exist"""
+        pygame.mixer.set_num_channels(count)
+    
+    def set_reserved(self, count):
+        """Keep the first channels away from Sound.play()"""
+        pygame.mixer.set_reserved(count)
+
+    def mixer_frequency(self):
+        """Get the rate the mixer actually runs at"""
+        init = pygame.mixer.get_init()
+        return init[0] if init else 22050
+
+    def output_time(self, start_time):
+        """Estimate when a sound started at start_time reaches the output: one mixer buffer later"""
+        return start_time + MIXER_BUFFER_FRAMES / self.mixer_frequency(), None
+
+class NullSound:
+    def __init__(self, backend, samples):
+        self.backend = backend
+        self.samples = samples
+        self.volume = 1.0
+    
+    def get_length(self):
+        """Get the length in seconds at the mixer rate"""
+        return len(self.samples) / self.backend.frequency
+    
+    def set_volume(self, volume):
+        """Set the playback volume (0.0 to 1.0)"""
+        self.volume = volume
+    
+    def get_volume(self):
+        """Get the playback volume"""
+        return self.volume
+    
+    def play(self, loops=0):
+        """Count a play on whichever channel pygame would have picked"""
+        self.backend.count_play(None, self)
+
+class NullChannel:
+    def __init__(self, backend, channel_num):
+        self.backend = backend
+        self.channel_num = channel_num
+        self.volume = 1.0
+        self.end_time = 0.0  # When the current sound would finish playing
+        self.queued = None
+    
+    def update(self):
+        """Start the queued sound once the current one would have finished"""
+        import time
+        if self.queued is not None and time.perf_counter() >= self.end_time:
+            self.end_time += self.queued.get_length()
+            self.queued = None
+    
+    def play(self, sound, loops=0):
+        """Count a play and keep the channel busy for as long as the sound would last"""
+        import time
+        self.backend.count_play(self.channel_num, sound)
+        self.queued = None
+        if loops < 0:
+            self.end_time = float('inf')
+        else:
+            self.end_time = time.perf_counter() + sound.get_length() * (loops + 1)
+    
+    def queue(self, sound):
+        """Count a sound queued to play after the current one"""
+        if not self.get_busy():
+            self.play(sound)
+        else:
+            self.backend.count_play(self.channel_num, sound)
+            self.queued = sound
+    
+    def get_busy(self):
+        """Check whether a sound would still be playing"""
+        import time
+        self.update()
+        return time.perf_counter() < self.end_time
+    
+    def get_queue(self):
+        """Get the sound waiting behind the current one"""
+        self.update()
+        return self.queued
+    
+    def stop(self):
+        """Stop playback and drop the queued sound"""
+        self.end_time = 0.0
+        self.queued = None
+    
+    def pause(self):
+        """Nothing is playing, so there is nothing to hold back"""
+        pass
+    
+    def unpause(self):
+        """Nothing is playing, so there is nothing to resume"""
+        pass
+    
+    def set_volume(self, left, right=None):
+        """Set the channel volume, or the left and right volumes"""
+        self.volume = left
+    
+    def get_volume(self):
+        """Get the channel volume"""
+        return self.volume
+
+class NullAudioBackend:
+    def __init__(self, frequency=22050):
+        self.frequency = frequency
+        self.channels = {}
+        self.plays = {}  # Channel number (None for Sound.play) -> number of sounds started
+        self.frames_played = 0
+        
+        # The pretend device pulls one mixer buffer after another from startup
+        import time
+        self.clock_start = time.perf_counter()
+    
+    def make_sound(self, samples):
+        """Wrap int16 samples in a sound that is never sent to a device"""
+        return NullSound(self, np.asarray(samples))
+    
+    def sound_array(self, sound):
+        """Copy a sound's samples into an array"""
+        return np.array(sound.samples)
+    
+    def channel(self, channel_num):
+        """Get a counting channel by number"""
+        if channel_num not in self.channels:
+            self.channels[channel_num] = NullChannel(self, channel_num)
+        return self.channels[channel_num]
+    
+    def set_num_channels(self, count):
+        """Channels are created on demand, so there is nothing to set up"""
+        pass
+    
+    def set_reserved(self, count):
+        """Sound.play() never picks a channel here, so there is nothing to reserve"""
+        pass
+    
+    def mixer_frequency(self):
+        """Get the rate the pretend device runs at"""
+        return self.frequency
+    
+    def output_time(self, start_time):
+        """Get the start of the first device buffer after start_time, and that buffer's number"""
+        buffer_seconds = MIXER_BUFFER_FRAMES / self.frequency
+        block = math.ceil((start_time - self.clock_start) / buffer_seconds)
+        return self.clock_start + block * buffer_seconds, block
+    
+    def count_play(self, channel_num, sound):
+        """Record a sound that would have started on a channel"""
+        self.plays[channel_num] = self.plays.get(channel_num, 0) + 1
+        self.frames_played += len(sound.samples)
+    
+    def summary(self):
+        """Describe what would have been played"""
+        counts = ", ".join(f"channel {num}: {count}" if num is not None else f"any channel: {count}"
+                           for num, count in sorted(self.plays.items(), key=lambda item: (item[0] is None, item[0] or 0)))
+        return f"Null audio played {sum(self.plays.values())} sounds ({counts}), {self.frames_played} frames"
 
 # Initialize audio with error handling
-try:
-    pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+if NULL_AUDIO:
+    audio_backend = NullAudioBackend()
     AUDIO_AVAILABLE = True
-    print("Audio initialized successfully")
-except pygame.error as e:
-    print(f"Audio not available: {e}")
-    AUDIO_AVAILABLE = False
+    print("Audio initialized with the null backend")
+else:
+    audio_backend = PygameAudioBackend()
+    try:
+        # Already open from pygame.init() unless the device failed there; retry to surface the error
+        pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=MIXER_BUFFER_FRAMES)
+        AUDIO_AVAILABLE = True
+        print("Audio initialized successfully")
+    except pygame.error as e:
+        print(f"Audio not available: {e}")
+        AUDIO_AVAILABLE = False
 
 # Constants
 SCREEN_WIDTH = 800
@@ -129,6 +323,11 @@ def get_color_scheme(level, progression_system=None):
     scheme_level = ((level - 1) % scheme_count) + 1
     return COLOR_SCHEMES[scheme_level]
 
+def sprite_area(x, y, radius):
+    """Get a rect safely covering everything drawn within radius of a point, with room for line widths"""
+    radius += 2
+    return pygame.Rect(int(x) - radius, int(y) - radius, 2 * radius + 1, 2 * radius + 1)
+
 class PowerUp:
     def __init__(self, row, col, x, y, power_type, sound_generator):
         self.row = row
@@ -215,6 +414,10 @@ class PowerUp:
         # Draw power-up symbol
         self.draw_symbol(screen, current_size)
     
+    def dirty_rect(self):
+        """Get the area the power-up can cover, glow included"""
+        return sprite_area(self.x, self.y, int(self.size * 1.2) + 8)
+    
     def draw_symbol(self, screen, size):
         """Draw the power-up type symbol"""
         if self.power_type == 'freeze':
@@ -268,84 +471,154 @@ class PowerUp:
                 y2 = self.y + math.sin(angle) * 8
                 pygame.draw.line(screen, WHITE, (int(x1), int(y1)), (int(x2), int(y2)), 2)
 
-class Particle:
-    def __init__(self, x, y, color, velocity, lifetime, size=2):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.velocity = velocity  # (vx, vy)
-        self.lifetime = lifetime
-        self.max_lifetime = lifetime
-        self.size = size
-        self.gravity = 0.1
-        
-    def update(self):
-        """Update particle position and lifetime"""
-        self.x += self.velocity[0]
-        self.y += self.velocity[1]
-        self.velocity = (self.velocity[0] * 0.98, self.velocity[1] + self.gravity)  # Air resistance + gravity
-        self.lifetime -= 1
-        return self.lifetime > 0
-    
-    def draw(self, screen):
-        """Draw the particle with fading alpha"""
-        if self.lifetime <= 0:
-            return
-        
-        alpha = int(255 * (self.lifetime / self.max_lifetime))
-        current_size = max(1, int(self.size * (self.lifetime / self.max_lifetime)))
-        
-        # Create surface with alpha
-        particle_surf = pygame.Surface((current_size * 2, current_size * 2), pygame.SRCALPHA)
-        pygame.draw.circle(particle_surf, (*self.color, alpha), (current_size, current_size), current_size)
-        screen.blit(particle_surf, (int(self.x - current_size), int(self.y - current_size)))
+# Most particles alive at once - the pool never grows, and anything spawned
+# while it is full is dropped
+PARTICLE_CAPACITY = 4096
+PARTICLE_DRAG = 0.98  # Air resistance, applied to horizontal speed every frame
+PARTICLE_GRAVITY = 0.1
+
+# Particles are drawn from cached circle stamps. Alpha is rounded to steps
+# of PARTICLE_ALPHA_STEP so a fading particle reuses a handful of stamps,
+# and the least recently used stamps are dropped past the cache size.
+PARTICLE_ALPHA_STEP = 16
+PARTICLE_STAMP_CACHE_SIZE = 512
 
 class ParticleSystem:
-    def __init__(self):
-        self.particles = []
+    def __init__(self, capacity=PARTICLE_CAPACITY):
+        # One array per particle property, live particles packed at the front
+        self.capacity = capacity
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.life = np.zeros(capacity, dtype=np.int32)  # Frames left
+        self.max_life = np.ones(capacity, dtype=np.int32)
+        self.size = np.zeros(capacity, dtype=np.int32)
+        self.color_index = np.zeros(capacity, dtype=np.int32)
+        self.arrays = (self.x, self.y, self.vx, self.vy, self.life, self.max_life, self.size, self.color_index)
+        self.colors = []  # Palette the color indices point into
+        self.color_indices = {}
+        self.dropped = 0
+        
+        self.stamps = OrderedDict()  # (color index, radius, alpha) -> circle sprite
+        self.stamp_hits = 0
+        self.stamp_misses = 0
+        self.draw_ms = 0.0  # Time the last draw took
+    
+    def palette_index(self, color):
+        """Get the palette index of a color, adding it on first use"""
+        color = tuple(color)
+        if color not in self.color_indices:
+            self.color_indices[color] = len(self.colors)
+            self.colors.append(color)
+        return self.color_indices[color]
+    
+    def spawn(self, x, y, color, vx, vy, lifetime, size):
+        """Add a burst of particles from one point, given arrays of their velocities, lifetimes and sizes"""
+        count = min(len(vx), self.capacity - self.count)
+        self.dropped += len(vx) - count
+        new = slice(self.count, self.count + count)
+        self.x[new] = x
+        self.y[new] = y
+        self.vx[new] = vx[:count]
+        self.vy[new] = vy[:count]
+        self.life[new] = lifetime[:count]
+        self.max_life[new] = lifetime[:count]
+        self.size[new] = size[:count]
+        self.color_index[new] = self.palette_index(color)
+        self.count += count
     
     def add_explosion(self, x, y, color, count=15):
         """Add explosion particles"""
-        import random
-        for _ in range(count):
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(2, 8)
-            vx = math.cos(angle) * speed
-            vy = math.sin(angle) * speed
-            lifetime = random.randint(20, 40)
-            size = random.randint(2, 4)
-            self.particles.append(Particle(x, y, color, (vx, vy), lifetime, size))
+        angle = np.random.uniform(0, 2 * math.pi, count)
+        speed = np.random.uniform(2, 8, count)
+        self.spawn(x, y, color, np.cos(angle) * speed, np.sin(angle) * speed,
+                   np.random.randint(20, 41, count), np.random.randint(2, 5, count))
     
     def add_trail(self, x, y, color, count=5):
         """Add trail particles"""
-        import random
-        for _ in range(count):
-            vx = random.uniform(-1, 1)
-            vy = random.uniform(-1, 1)
-            lifetime = random.randint(10, 20)
-            size = random.randint(1, 3)
-            self.particles.append(Particle(x, y, color, (vx, vy), lifetime, size))
+        self.spawn(x, y, color, np.random.uniform(-1, 1, count), np.random.uniform(-1, 1, count),
+                   np.random.randint(10, 21, count), np.random.randint(1, 4, count))
     
     def add_sparks(self, x, y, color, count=8):
         """Add spark particles"""
-        import random
-        for _ in range(count):
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(3, 6)
-            vx = math.cos(angle) * speed
-            vy = math.sin(angle) * speed - 2  # Upward bias
-            lifetime = random.randint(15, 30)
-            size = random.randint(1, 2)
-            self.particles.append(Particle(x, y, color, (vx, vy), lifetime, size))
+        angle = np.random.uniform(0, 2 * math.pi, count)
+        speed = np.random.uniform(3, 6, count)
+        vy = np.sin(angle) * speed - 2  # Upward bias
+        self.spawn(x, y, color, np.cos(angle) * speed, vy,
+                   np.random.randint(15, 31, count), np.random.randint(1, 3, count))
     
     def update(self):
-        """Update all particles"""
-        self.particles = [p for p in self.particles if p.update()]
+        """Move all particles one frame and remove the ones that burned out"""
+        live = slice(0, self.count)
+        self.x[live] += self.vx[live]
+        self.y[live] += self.vy[live]
+        self.vx[live] *= PARTICLE_DRAG
+        self.vy[live] += PARTICLE_GRAVITY
+        self.life[live] -= 1
+        
+        # Swap-remove: the last live particles move into the holes left
+        # before the new end, so the pool stays packed without shifting
+        dead = np.flatnonzero(self.life[live] <= 0)
+        if len(dead):
+            end = self.count - len(dead)
+            holes = dead[dead < end]
+            movers = np.flatnonzero(self.life[end:self.count] > 0) + end
+            for array in self.arrays:
+                array[holes] = array[movers]
+            self.count = end
+    
+    def stamp(self, color_index, radius, alpha):
+        """Get the circle sprite for a color, radius and alpha, drawing it on first use"""
+        key = (color_index, radius, alpha)
+        if key in self.stamps:
+            self.stamp_hits += 1
+            self.stamps.move_to_end(key)
+            return self.stamps[key]
+        
+        self.stamp_misses += 1
+        stamp = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(stamp, (*self.colors[color_index], alpha), (radius, radius), radius)
+        if pygame.display.get_surface():
+            stamp = stamp.convert_alpha()
+        
+        self.stamps[key] = stamp
+        if len(self.stamps) > PARTICLE_STAMP_CACHE_SIZE:
+            self.stamps.popitem(last=False)
+        return stamp
+    
+    def stamp_hit_rate(self):
+        """Get the share of stamp lookups served from the cache"""
+        lookups = self.stamp_hits + self.stamp_misses
+        return self.stamp_hits / lookups if lookups else 0.0
     
     def draw(self, screen):
-        """Draw all particles"""
-        for particle in self.particles:
-            particle.draw(screen)
+        """Draw all particles in one batch, shrinking and fading out over their lifetime"""
+        import time
+        start = time.perf_counter()
+        
+        live = slice(0, self.count)
+        remaining = self.life[live] / self.max_life[live]
+        alphas = np.minimum(255, np.rint(255 * remaining / PARTICLE_ALPHA_STEP).astype(int) * PARTICLE_ALPHA_STEP)
+        radii = np.maximum(1, (self.size[live] * remaining).astype(int))
+        lefts = (self.x[live] - radii).astype(int).tolist()
+        tops = (self.y[live] - radii).astype(int).tolist()
+        
+        # Look each stamp up once per frame, however many particles share it
+        keys = list(zip(self.color_index[live].tolist(), radii.tolist(), alphas.tolist()))
+        stamps = {key: self.stamp(*key) for key in set(keys)}
+        screen.blits([(stamps[key], (left, top)) for key, left, top in zip(keys, lefts, tops)], doreturn=False)
+        
+        self.draw_ms = (time.perf_counter() - start) * 1000
+    
+    def dirty_rects(self):
+        """Get the areas covered by live particles"""
+        live = slice(0, self.count)
+        radius = self.size[live] + 2
+        left = self.x[live].astype(int) - radius
+        top = self.y[live].astype(int) - radius
+        return [pygame.Rect(l, t, 2 * r + 1, 2 * r + 1) for l, t, r in zip(left.tolist(), top.tolist(), radius.tolist())]
 
 class ScreenShake:
     def __init__(self):
@@ -375,6 +648,25 @@ class ScreenShake:
         """Get current shake offset"""
         return self.shake_offset
 
+class Camera:
+    def __init__(self, width, height):
+        # The game world, drawn unshifted and kept between frames
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        if pygame.display.get_surface():
+            self.surface = self.surface.convert_alpha()
+        self.offset = (0, 0)
+        self.drawn_area = self.surface.get_rect()  # Part of the surface that may hold last frame
+    
+    def begin(self, offset=(0, 0)):
+        """Clear the world surface for a new frame seen from the given shake offset"""
+        self.offset = offset
+        self.surface.fill((0, 0, 0, 0), self.drawn_area)
+    
+    def draw(self, screen, rects):
+        """Blit the area covered by the given world rects onto the screen, shifted by the shake offset"""
+        self.drawn_area = rects[0].unionall(rects[1:]).clip(self.surface.get_rect())
+        screen.blit(self.surface, self.drawn_area.move(self.offset), self.drawn_area)
+
 class AnimatedBackground:
     def __init__(self, width, height):
         self.width = width
@@ -487,6 +779,12 @@ class AnimatedBackground:
                 pygame.draw.polygon(shape_surf, color_with_alpha, points, 2)
             
             screen.blit(shape_surf, (int(shape['x'] - current_size), int(shape['y'] - current_size)))
+    
+    def dirty_rects(self):
+        """Get the areas of the stars and shapes, which all change every frame"""
+        rects = [sprite_area(star['x'], star['y'], star['size']) for star in self.stars]
+        rects.extend(sprite_area(shape['x'], shape['y'], shape['size']) for shape in self.geometric_shapes)
+        return rects
 
 class MovingPlatform:
     def __init__(self, row, col, x, y, sound_generator, level):
@@ -537,6 +835,7 @@ class MovingPlatform:
                 self.y = self.start_pos[1] + (self.target_pos[1] - self.start_pos[1]) * progress
                 self.cube.x = self.x
                 self.cube.y = self.y
+            pyramid_layer.mark_dirty(self.cube)
         else:
             # Check if time to start moving
             if current_time - self.move_timer > self.move_interval:
@@ -590,6 +889,10 @@ class MovingPlatform:
                 pygame.draw.line(screen, WHITE, (int(arrow_x), int(arrow_y)), 
                                (int(tip_x), int(tip_y)), 2)
     
+    def dirty_rect(self):
+        """Get the area of the platform's cube and movement arrows"""
+        return sprite_area(self.x, self.y, 43).union(self.cube.sprite_rect())
+    
     def step_on(self):
         """Handle stepping on moving platform"""
         return self.cube.step_on(self.particle_system, self.screen_shake)
@@ -845,6 +1148,10 @@ class Enemy:
         """Draw the enemy"""
         pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.size)
         pygame.draw.circle(screen, BLACK, (int(self.x), int(self.y)), self.size, 2)
+    
+    def dirty_rect(self):
+        """Get the area the enemy can cover"""
+        return sprite_area(self.x, self.y, self.size)
 
 class Coily(Enemy):
     def __init__(self, sound_generator, level=1):
@@ -1059,156 +1366,416 @@ class Coily(Enemy):
                 spiral_x = self.x + math.cos(angle) * (body_size + 10)
                 spiral_y = self.y + math.sin(angle) * (body_size + 10)
                 pygame.draw.circle(screen, (255, 0, 255, 100), (int(spiral_x), int(spiral_y)), 3)
+    
+    def dirty_rect(self):
+        """Get the area Coily can cover, from the glow and head down to the tail"""
+        return sprite_area(self.x, self.y, self.size + 20)
+
+# New Wave/Electronic 80s style music with different progressions
+MUSIC_THEMES = {
+    1: {  # Neon Dreams - New Wave style
+        'chords': [(220, 293, 349), (196, 261, 311), (233, 293, 369), (220, 293, 349)],
+        'bass_line': [110, 98, 116, 110],
+        'lead_melody': [440, 523, 587, 523, 440, 392, 349, 392],
+        'drum_pattern': [1, 0, 1, 0, 1, 0, 1, 1],  # Electronic drum pattern
+        'tempo': 0.4
+    },
+    2: {  # Cyber Pulse - Driving electronic
+        'chords': [(261, 329, 392), (246, 311, 369), (277, 349, 415), (261, 329, 392)],
+        'bass_line': [130, 123, 138, 130],
+        'lead_melody': [523, 659, 698, 659, 523, 466, 415, 466],
+        'drum_pattern': [1, 1, 0, 1, 1, 0, 1, 0],
+        'tempo': 0.35
+    },
+    3: {  # Digital Rain - Atmospheric
+        'chords': [(174, 220, 261), (196, 246, 293), (220, 277, 329), (174, 220, 261)],
+        'bass_line': [87, 98, 110, 87],
+        'lead_melody': [349, 440, 523, 440, 349, 311, 277, 311],
+        'drum_pattern': [1, 0, 0, 1, 1, 0, 0, 1],
+        'tempo': 0.5
+    },
+    4: {  # Retro Future - Upbeat electronic
+        'chords': [(293, 369, 440), (329, 415, 493), (277, 349, 415), (293, 369, 440)],
+        'bass_line': [146, 164, 138, 146],
+        'lead_melody': [587, 698, 784, 698, 587, 523, 466, 523],
+        'drum_pattern': [1, 0, 1, 1, 1, 0, 1, 0],
+        'tempo': 0.3
+    },
+    5: {  # Neon Nights - Dark electronic
+        'chords': [(155, 196, 233), (174, 220, 261), (196, 246, 293), (155, 196, 233)],
+        'bass_line': [77, 87, 98, 77],
+        'lead_melody': [311, 392, 466, 392, 311, 277, 246, 277],
+        'drum_pattern': [1, 1, 0, 0, 1, 1, 0, 1],
+        'tempo': 0.45
+    },
+    6: {  # Electric Dreams - Melodic electronic
+        'chords': [(246, 311, 369), (277, 349, 415), (311, 392, 466), (246, 311, 369)],
+        'bass_line': [123, 138, 155, 123],
+        'lead_melody': [493, 622, 740, 622, 493, 440, 392, 440],
+        'drum_pattern': [1, 0, 1, 0, 1, 1, 0, 1],
+        'tempo': 0.4
+    }
+}
+
+# Rendered audio cache - bump the version whenever a generator's output changes
+AUDIO_GENERATOR_VERSION = 7
+AUDIO_CACHE_DIR = "qbert_audio_cache"
+AUDIO_CACHE_MAX_BYTES = 32 * 1024 * 1024  # 32 MB
+
+# Music renders at this fixed gain, just under the clipping point of the
+# loudest theme - the volume setting is applied on top as mixer channel gain
+MUSIC_HEADROOM = 0.9
+
+# Generators whose oscillators read band-limited wavetables instead of
+# evaluating each waveform directly
+WAVETABLE_GENERATORS = {'tone', 'hop', 'cube_change', 'coily', 'power_up', 'fanfare', 'background_music', 'ambient'}
+
+# Pitched copies of sound effects kept in memory, least recently played dropped first
+SFX_VARIANT_CACHE_SIZE = 32
+
+# Sound latency log, written while the debug overlay (F3) is open or with QBERT_LATENCY_LOG=1
+AUDIO_LATENCY_LOG = "qbert_audio_latency.log"
+LATENCY_LOGGING = os.environ.get("QBERT_LATENCY_LOG", "0") == "1"
+
+# Upper edges of the latency histogram buckets in milliseconds; the last bucket takes the rest
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100)
+
+# Stream music in short blocks instead of one long looping buffer
+MUSIC_STREAMING = os.environ.get("QBERT_STREAM_MUSIC", "0") == "1"
+
+# Mix sound effects in software into one streamed channel instead of
+# giving each effect its own mixer channel
+SOFTWARE_MIXER = os.environ.get("QBERT_SOFTWARE_MIXER", "0") == "1"
+
+class AudioCache:
+    def __init__(self, cache_dir=AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        
+        # Warm-up callbacks and prefetch threads store at the same time
+        import threading
+        self.write_lock = threading.Lock()
+    
+    def make_key(self, name, params):
+        """Hash a generator name and its synthesis parameters into a cache key"""
+        import hashlib
+        import json
+        description = json.dumps({
+            'name': name,
+            'version': AUDIO_GENERATOR_VERSION,
+            'params': params
+        }, sort_keys=True)
+        return hashlib.sha256(description.encode('utf-8')).hexdigest()
+    
+    def get_path(self, key):
+        """Get the file path for a cache key"""
+        import os
+        return os.path.join(self.cache_dir, key + ".npy")
+    
+    def load(self, key):
+        """Memory-map a cached int16 buffer, or return None on a miss"""
+        import os
+        path = self.get_path(key)
+        try:
+            if os.path.exists(path):
+                arr = np.load(path, mmap_mode='r')
+                os.utime(path)  # Mark as recently used for eviction
+                self.hits += 1
+                return arr
+        except Exception as e:
+            print(f"Could not load cached audio: {e}")
+        self.misses += 1
+        return None
+    
+    def store(self, key, arr):
+        """Write a rendered int16 buffer to the cache"""
+        import os
+        path = self.get_path(key)
+        with self.write_lock:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # Write to a temporary file first so readers never see half a buffer
+                temp_path = path + ".tmp"
+                with open(temp_path, 'wb') as f:
+                    np.save(f, arr)
+                os.replace(temp_path, path)
+            except Exception as e:
+                print(f"Could not save cached audio: {e}")
+                return
+            self.evict()
+    
+    def evict(self):
+        """Remove least recently used entries until the cache fits its size cap"""
+        import contextlib
+        import os
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".npy"):
+                path = os.path.join(self.cache_dir, filename)
+                # Another writer may evict the same entry between the listing and here
+                with contextlib.suppress(FileNotFoundError):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total_size -= size
 
 class SoundGenerator:
     def __init__(self):
         self.sample_rate = 22050
         self.audio_available = AUDIO_AVAILABLE
         self.current_music_level = 0
-        self.music_volume = 0.3
+        self.music_volume = 0.3  # Volumes are mixer gain, never baked into samples
         self.sfx_volume = 0.5
+        self.music_duration = 16.0  # Longer tracks for more complex arrangements
+        self.cache = AudioCache()
+        self.filter_sweep_curve = None  # Same for every theme, computed once
+        self.kick_carrier = None  # Same for every theme, computed once
+        self.rng = np.random.default_rng()  # Noise source, freshly seeded for every generator
+        self.wavetable_generators = set(WAVETABLE_GENERATORS)
+        
+        # Sound effects are rendered once and replayed by name
+        self.sfx_bank = {}
+        self.voice_pool = None  # Installed by AudioManager once the mixer channels exist
+        self.sfx_generators = {
+            'hop': self.generate_hop_sound,
+            'cube_change': self.generate_cube_change_sound,
+            'coily': self.generate_coily_sound,
+            'power_up': self.generate_power_up_sound,
+            'fanfare': self.generate_level_complete_fanfare
+        }
         
+        # Pitched variants are resampled from the banked sound, never synthesized
+        self.sfx_variants = OrderedDict()  # (name, pitch) -> sound, oldest first
+        self.variant_hits = 0
+        self.variant_misses = 0
+        
+        # Times every effect from the game event that triggered it to the output
+        self.latency = AudioLatencyMonitor()
+    
+    def get_sfx(self, name):
+        """Get a sound effect from the bank, rendering it on first use"""
+        if not self.audio_available:
+            return None
+        
+        if name not in self.sfx_bank:
+            self.add_sfx(name, self.sfx_generators[name]())
+        return self.sfx_bank[name]
+    
+    def add_sfx(self, name, sound):
+        """Put a rendered sound effect in the bank at the current effects volume"""
+        if sound:
+            sound.set_volume(self.sfx_volume)
+        self.sfx_bank[name] = sound
+    
+    def get_sfx_variant(self, name, pitch):
+        """Get a sound effect shifted by a pitch ratio, resampled from the banked sound on first use"""
+        if pitch == 1.0:
+            return self.get_sfx(name)
+        
+        key = (name, pitch)
+        if key in self.sfx_variants:
+            self.variant_hits += 1
+            self.sfx_variants.move_to_end(key)
+            return self.sfx_variants[key]
+        
+        self.variant_misses += 1
+        base = self.get_sfx(name)
+        if not base:
+            return None
+        mono = audio_backend.sound_array(base)[:, 0] / 32767.0
+        sound = audio_backend.make_sound(dsp.to_int16(dsp.resample(mono, pitch)))
+        sound.set_volume(self.sfx_volume)
+        
+        self.sfx_variants[key] = sound
+        if len(self.sfx_variants) > SFX_VARIANT_CACHE_SIZE:
+            self.sfx_variants.popitem(last=False)
+        return sound
+    
+    def sfx_pitch(self, level, step=1):
+        """Get the pitch ratio of an effect: a semitone up per level of the six-theme cycle, a major third per cube step"""
+        semitones = (level - 1) % 6 + 4 * (step - 1)
+        return 2 ** (semitones / 12)
+    
+    def preload_sfx_variants(self, level, max_steps=3):
+        """Resample a level's pitched hop and cube change sounds ahead of gameplay"""
+        self.get_sfx_variant('hop', self.sfx_pitch(level))
+        for step in range(1, max_steps + 1):
+            self.get_sfx_variant('cube_change', self.sfx_pitch(level, step))
+    
+    def play_sfx(self, name, pan=0.0, pitch=1.0):
+        """Play a sound effect from the bank, panned from -1 (left) to 1 (right) and shifted by a pitch ratio"""
+        sound = self.get_sfx_variant(name, pitch)
+        if sound:
+            record = self.latency.begin(name)
+            if self.voice_pool:
+                self.voice_pool.play(sound, name, pan, record)
+            else:
+                sound.play()
+                self.latency.started(record)
+                self.latency.emitted(record, *audio_backend.output_time(record['start']))
+    
+    def preload_sfx(self, names=None):
+        """Render sound effects into the bank ahead of gameplay (all of them by default)"""
+        for name in names or self.sfx_generators:
+            self.get_sfx(name)
+    
+    def cache_key(self, name, params):
+        """Get the disk cache key for a generator's output at this sample rate"""
+        return self.cache.make_key(name, dict(params, sample_rate=self.sample_rate,
+                                              wavetable=self.uses_wavetables(name)))
+    
+    def uses_wavetables(self, generator):
+        """Check whether a generator's oscillators read wavetables"""
+        return generator in self.wavetable_generators
+    
+    def waveform(self, generator, phase, shape='sine', max_freq=None):
+        """Evaluate a waveform for a generator, from a wavetable band-limited below max_freq if it uses them"""
+        if self.uses_wavetables(generator):
+            harmonics = dsp.band_limit(max_freq, self.sample_rate) if max_freq is not None else 1
+            return dsp.wavetable_waveform(phase, shape, harmonics)
+        return dsp.waveform(phase, shape)
+    
+    def cached_render(self, name, params, render):
+        """Load rendered samples from the disk cache, rendering and storing them on a miss"""
+        key = self.cache_key(name, params)
+        
+        arr = self.cache.load(key)
+        if arr is None:
+            arr = render()
+            self.cache.store(key, arr)
+        return arr
+    
+    def cached_sound(self, name, params, render):
+        """Build a sound from the disk cache, rendering and storing it on a miss"""
+        sound = audio_backend.make_sound(self.cached_render(name, params, render))
+        return sound
+    
     def generate_tone(self, frequency, duration, volume=0.3):
         """Generate a simple tone"""
         if not self.audio_available:
             return None
-            
+        
+        params = {'frequency': frequency, 'duration': duration, 'volume': volume}
+        return self.cached_sound('tone', params, lambda: self.render_tone(frequency, duration, volume))
+    
+    def render_tone(self, frequency, duration, volume=0.3):
+        """Render a simple tone as int16 samples"""
         frames = int(duration * self.sample_rate)
-        arr = np.zeros((frames, 2))
         
-        for i in range(frames):
-            # Create a sine wave with slight decay for retro feel
-            decay = 1.0 - (i / frames) * 0.3  # Slight volume decay
-            wave = np.sin(2 * np.pi * frequency * i / self.sample_rate) * volume * decay
-            arr[i] = [wave, wave]
+        # Create a sine wave with slight decay for retro feel
+        wave = dsp.oscillator(frequency, frames, self.sample_rate, wavetable=self.uses_wavetables('tone'))
+        decay = dsp.ramp(frames, 1.0, 0.7)  # Slight volume decay
         
         # Convert to pygame sound format
-        arr = (arr * 32767).astype(np.int16)
-        sound = pygame.sndarray.make_sound(arr)
-        return sound
-    
+        return dsp.to_int16(wave * volume * decay)
+
     def generate_hop_sound(self):
         """Generate Q-Bert's signature hop sound - a rising chirp"""
         if not self.audio_available:
             return None
-            
+        
+        return self.cached_sound('hop', {}, self.render_hop_sound)
+    
+    def render_hop_sound(self):
+        """Render the hop chirp as int16 samples"""
         duration = 0.15  # Short sound
         frames = int(duration * self.sample_rate)
-        arr = np.zeros((frames, 2))
         
-        # Create a frequency sweep from low to high (like a hop)
-        start_freq = 200
-        end_freq = 400
+        # Create a frequency sweep from low to high (like a hop). The classic
+        # chirp ends at 600 Hz: the nominal 200->400 Hz sweep was applied to
+        # absolute time, which doubles the rate of change in pitch.
+        wave = dsp.chirp(200, 600, frames, self.sample_rate, wavetable=self.uses_wavetables('hop'))
         
-        for i in range(frames):
-            # Frequency increases over time (rising pitch)
-            progress = i / frames
-            frequency = start_freq + (end_freq - start_freq) * progress
-            
-            # Volume envelope - quick attack, gradual decay
-            if progress < 0.1:
-                volume = progress * 10  # Quick ramp up
-            else:
-                volume = 1.0 - ((progress - 0.1) / 0.9) * 0.7  # Gradual decay
-            
-            wave = np.sin(2 * np.pi * frequency * i / self.sample_rate) * volume * self.sfx_volume
-            arr[i] = [wave, wave]
+        # Volume envelope - quick attack, gradual decay
+        volume = dsp.adsr(frames, attack=0.1, decay=0.9, sustain=0.3)
         
-        # Convert to pygame sound format
-        arr = (arr * 32767).astype(np.int16)
-        sound = pygame.sndarray.make_sound(arr)
-        return sound
-    
+        return dsp.to_int16(wave * volume)
+
     def generate_cube_change_sound(self):
         """Generate sound for when a cube changes color"""
         if not self.audio_available:
             return None
-            
+        
+        return self.cached_sound('cube_change', {}, self.render_cube_change_sound)
+    
+    def render_cube_change_sound(self):
+        """Render the cube color change tone as int16 samples"""
         duration = 0.1
         frames = int(duration * self.sample_rate)
-        arr = np.zeros((frames, 2))
-        
-        # Simple descending tone
-        start_freq = 600
-        end_freq = 400
         
-        for i in range(frames):
-            progress = i / frames
-            frequency = start_freq - (start_freq - end_freq) * progress
-            volume = 1.0 - progress * 0.5  # Fade out
-            
-            wave = np.sin(2 * np.pi * frequency * i / self.sample_rate) * volume * self.sfx_volume
-            arr[i] = [wave, wave]
+        # Simple descending tone (600 Hz falling to 200 Hz, as with the hop chirp)
+        wave = dsp.chirp(600, 200, frames, self.sample_rate, wavetable=self.uses_wavetables('cube_change'))
+        volume = dsp.ramp(frames, 1.0, 0.5)  # Fade out
         
-        arr = (arr * 32767).astype(np.int16)
-        sound = pygame.sndarray.make_sound(arr)
-        return sound
-    
+        return dsp.to_int16(wave * volume)
+
     def generate_coily_sound(self):
         """Generate Coily's menacing snake hiss"""
         if not self.audio_available:
             return None
-            
+        
+        return self.cached_sound('coily', {}, self.render_coily_sound)
+    
+    def render_coily_sound(self):
+        """Render Coily's hiss as int16 samples"""
         duration = 0.3
         frames = int(duration * self.sample_rate)
-        arr = np.zeros((frames, 2))
+        i = dsp.time_axis(frames)
         
-        # Create a hissing sound with noise and low frequency
-        import random
-        for i in range(frames):
-            # Base hiss frequency
-            base_freq = 150 + 50 * math.sin(i * 0.01)
-            
-            # Add noise for hiss effect
-            noise = (random.random() - 0.5) * 0.3
-            
-            # Combine sine wave with noise
-            wave = (np.sin(2 * np.pi * base_freq * i / self.sample_rate) * 0.4 + noise) * self.sfx_volume
-            
-            # Volume envelope
-            volume = 1.0 - (i / frames) * 0.6
-            arr[i] = [wave * volume, wave * volume]
+        # Base hiss frequency wobbles around 150 Hz. It multiplies absolute
+        # time, so the wobble turns into a wide phase-modulated rasp.
+        base_freq = 150 + 50 * np.sin(i * 0.01)
+        hiss = self.waveform('coily', 2 * np.pi * base_freq * i / self.sample_rate) * 0.4
         
-        arr = np.clip(arr * 32767, -32767, 32767).astype(np.int16)
-        sound = pygame.sndarray.make_sound(arr)
-        return sound
-    
+        # Add noise for hiss effect
+        noise = dsp.noise(frames, 0.15, rng=self.rng)
+        
+        # Volume envelope
+        volume = dsp.ramp(frames, 1.0, 0.4)
+        
+        return dsp.to_int16(dsp.mix(hiss, noise) * volume)
+
     def generate_power_up_sound(self):
         """Generate power-up collection sound"""
         if not self.audio_available:
             return None
-            
+        
+        return self.cached_sound('power_up', {}, self.render_power_up_sound)
+    
+    def render_power_up_sound(self):
+        """Render the power-up arpeggio as int16 samples"""
         duration = 0.4
         frames = int(duration * self.sample_rate)
-        arr = np.zeros((frames, 2))
         
         # Ascending arpeggio
         frequencies = [440, 554, 659, 880]  # A major chord
+        notes = [(freq, duration / len(frequencies)) for freq in frequencies]
         
-        for i in range(frames):
-            progress = i / frames
-            freq_index = int(progress * len(frequencies))
-            if freq_index >= len(frequencies):
-                freq_index = len(frequencies) - 1
-                
-            frequency = frequencies[freq_index]
-            volume = 1.0 - progress * 0.3
-            
-            wave = np.sin(2 * np.pi * frequency * i / self.sample_rate) * volume * self.sfx_volume
-            arr[i] = [wave, wave]
+        wave = dsp.oscillator(dsp.note_sequence(notes, self.sample_rate)[:frames], frames, self.sample_rate,
+                              wavetable=self.uses_wavetables('power_up'))
+        volume = dsp.ramp(frames, 1.0, 0.7)
         
-        arr = (arr * 32767).astype(np.int16)
-        sound = pygame.sndarray.make_sound(arr)
-        return sound
-    
+        return dsp.to_int16(wave * volume)
+
     def generate_level_complete_fanfare(self):
         """Generate victory fanfare for level completion"""
         if not self.audio_available:
             return None
-            
+        
+        return self.cached_sound('fanfare', {}, self.render_level_complete_fanfare)
+    
+    def render_level_complete_fanfare(self):
+        """Render the victory fanfare as int16 samples"""
         duration = 2.0  # Longer fanfare
         frames = int(duration * self.sample_rate)
-        arr = np.zeros((frames, 2))
         
         # Victory melody - classic arcade style
         melody = [
@@ -1220,224 +1787,755 @@ class SoundGenerator:
             (1047, 0.6)  # C (octave) - held
         ]
         
-        current_frame = 0
-        for freq, note_duration in melody:
-            note_frames = int(note_duration * self.sample_rate)
-            
-            for i in range(note_frames):
-                if current_frame + i >= frames:
-                    break
-                    
-                # Note envelope
-                note_progress = i / note_frames
-                if note_progress < 0.1:
-                    volume = note_progress * 10
-                else:
-                    volume = 1.0 - ((note_progress - 0.1) / 0.9) * 0.5
-                
-                wave = np.sin(2 * np.pi * freq * (current_frame + i) / self.sample_rate) * volume * self.sfx_volume
-                arr[current_frame + i] = [wave, wave]
-            
-            current_frame += note_frames
+        freqs = dsp.note_sequence(melody, self.sample_rate)
+        wave = dsp.oscillator(freqs, len(freqs), self.sample_rate, wavetable=self.uses_wavetables('fanfare'))
         
-        arr = (arr * 32767).astype(np.int16)
-        sound = pygame.sndarray.make_sound(arr)
-        return sound
-    
+        # Note envelope restarts on every note
+        volume = np.concatenate([
+            dsp.adsr(int(note_duration * self.sample_rate), attack=0.1, decay=0.9, sustain=0.5)
+            for _, note_duration in melody
+        ])
+        
+        # Silence after the last note
+        arr = np.zeros(frames, dtype=dsp.SAMPLE_DTYPE)
+        melody_frames = min(len(wave), frames)
+        arr[:melody_frames] = (wave * volume)[:melody_frames]
+        return dsp.to_int16(arr)
+
     def generate_background_music(self, level):
         """Generate new wave/electronic 80s background music based on level theme"""
         if not self.audio_available:
             return None
-            
-        # New Wave/Electronic 80s style music with different progressions
-        music_data = {
-            1: {  # Neon Dreams - New Wave style
-                'chords': [(220, 293, 349), (196, 261, 311), (233, 293, 369), (220, 293, 349)],
-                'bass_line': [110, 98, 116, 110],
-                'lead_melody': [440, 523, 587, 523, 440, 392, 349, 392],
-                'drum_pattern': [1, 0, 1, 0, 1, 0, 1, 1],  # Electronic drum pattern
-                'tempo': 0.4
-            },
-            2: {  # Cyber Pulse - Driving electronic
-                'chords': [(261, 329, 392), (246, 311, 369), (277, 349, 415), (261, 329, 392)],
-                'bass_line': [130, 123, 138, 130],
-                'lead_melody': [523, 659, 698, 659, 523, 466, 415, 466],
-                'drum_pattern': [1, 1, 0, 1, 1, 0, 1, 0],
-                'tempo': 0.35
-            },
-            3: {  # Digital Rain - Atmospheric
-                'chords': [(174, 220, 261), (196, 246, 293), (220, 277, 329), (174, 220, 261)],
-                'bass_line': [87, 98, 110, 87],
-                'lead_melody': [349, 440, 523, 440, 349, 311, 277, 311],
-                'drum_pattern': [1, 0, 0, 1, 1, 0, 0, 1],
-                'tempo': 0.5
-            },
-            4: {  # Retro Future - Upbeat electronic
-                'chords': [(293, 369, 440), (329, 415, 493), (277, 349, 415), (293, 369, 440)],
-                'bass_line': [146, 164, 138, 146],
-                'lead_melody': [587, 698, 784, 698, 587, 523, 466, 523],
-                'drum_pattern': [1, 0, 1, 1, 1, 0, 1, 0],
-                'tempo': 0.3
-            },
-            5: {  # Neon Nights - Dark electronic
-                'chords': [(155, 196, 233), (174, 220, 261), (196, 246, 293), (155, 196, 233)],
-                'bass_line': [77, 87, 98, 77],
-                'lead_melody': [311, 392, 466, 392, 311, 277, 246, 277],
-                'drum_pattern': [1, 1, 0, 0, 1, 1, 0, 1],
-                'tempo': 0.45
-            },
-            6: {  # Electric Dreams - Melodic electronic
-                'chords': [(246, 311, 369), (277, 349, 415), (311, 392, 466), (246, 311, 369)],
-                'bass_line': [123, 138, 155, 123],
-                'lead_melody': [493, 622, 740, 622, 493, 440, 392, 440],
-                'drum_pattern': [1, 0, 1, 0, 1, 1, 0, 1],
-                'tempo': 0.4
-            }
-        }
         
+        sound = audio_backend.make_sound(self.background_music_samples(level))
+        return sound
+    
+    def background_music_samples(self, level):
+        """Get the int16 samples of a level's background music, using the disk cache"""
+        return self.cached_render('background_music', self.music_cache_params(level),
+                                  lambda: self.render_background_music(level))
+    
+    def music_cache_params(self, level):
+        """Get the synthesis parameters that identify a level's music in the disk cache"""
         theme_num = ((level - 1) % 6) + 1
-        music_info = music_data.get(theme_num, music_data[1])
+        return {'theme': MUSIC_THEMES.get(theme_num, MUSIC_THEMES[1]), 'headroom': MUSIC_HEADROOM}
+    
+    def render_background_music(self, level):
+        """Render the background music for a level theme as int16 samples"""
+        theme_num = ((level - 1) % 6) + 1
+        music_info = MUSIC_THEMES.get(theme_num, MUSIC_THEMES[1])
         
-        duration = 16.0  # Longer tracks for more complex arrangements
-        frames = int(duration * self.sample_rate)
-        arr = np.zeros((frames, 2))
+        frames = int(self.music_duration * self.sample_rate)
+        dry = self.render_music_dry(music_info, 0, frames)
         
-        chord_duration = duration / len(music_info['chords'])
-        beat_duration = chord_duration / len(music_info['drum_pattern'])
+        # Filter sweep and reverb run as a post-processing pass over the whole mix
+        arr = self.music_effects().process(dry)
+        return dsp.to_int16(arr)
+    
+    def render_music_dry(self, music_info, start_frame, end_frame, cells=None):
+        """Render the dry mix of a theme between two absolute frame positions of the track"""
+        cells = {} if cells is None else cells  # Beat layers already rendered, shared between beats
+        arr = np.zeros(end_frame - start_frame, dtype=dsp.SAMPLE_DTYPE)
+        
+        lead_melody = music_info['lead_melody']
+        drum_pattern = music_info['drum_pattern']
+        chord_duration = self.music_duration / len(music_info['chords'])
+        beat_duration = chord_duration / len(drum_pattern)
         
+        # Every chord is one beat per drum step; each beat plays one lead note
         for chord_idx, (chord, bass_freq) in enumerate(zip(music_info['chords'], music_info['bass_line'])):
-            start_frame = int(chord_idx * chord_duration * self.sample_rate)
-            end_frame = int((chord_idx + 1) * chord_duration * self.sample_rate)
-            
+            chord_start = int(chord_idx * chord_duration * self.sample_rate)
+            for beat in range(len(drum_pattern)):
+                beat_start = chord_start + int(beat * beat_duration * self.sample_rate)
+                beat_end = chord_start + int((beat + 1) * beat_duration * self.sample_rate)
+                block_start = max(start_frame, beat_start)
+                block_end = min(end_frame, beat_end)
+                
+                if block_start < block_end:
+                    arr[block_start - start_frame:block_end - start_frame] = self.render_music_beat(
+                        chord, bass_freq, lead_melody[beat % len(lead_melody)], drum_pattern[beat] != 0,
+                        beat_start, beat_end, block_start, block_end, cells)
+        return arr
+    
+    def phase_origin(self, freqs, frame):
+        """Get the earliest frame where oscillators at these frequencies have the same phase as at `frame`"""
+        # Whole-number frequencies complete whole cycles every second
+        if all(float(freq).is_integer() for freq in freqs):
+            return frame % self.sample_rate
+        return frame
+    
+    def render_music_beat(self, chord, bass_freq, lead_freq, drum_on, beat_start, beat_end,
+                          start_frame, end_frame, cells):
+        """Render the dry mix of one beat between two absolute frame positions"""
+        beat_frames = beat_end - beat_start
+        offset = start_frame - beat_start
+        frames = end_frame - start_frame
+        
+        # Pads and bass only depend on the chord and the oscillator phase at the
+        # start of the beat, so every beat that matches an earlier one reuses it
+        harmony_origin = self.phase_origin(tuple(chord) + (bass_freq, bass_freq * 2), beat_start)
+        harmony_key = ('harmony', tuple(chord), bass_freq, harmony_origin, beat_frames)
+        if harmony_key not in cells:
+            i = np.arange(harmony_origin, harmony_origin + beat_frames)
             freq1, freq2, freq3 = chord
             
-            for i in range(start_frame, min(end_frame, frames)):
-                # New Wave style chord pads (softer, more atmospheric)
-                pad1 = np.sin(2 * np.pi * freq1 * i / self.sample_rate) * 0.12
-                pad2 = np.sin(2 * np.pi * freq2 * i / self.sample_rate) * 0.10
-                pad3 = np.sin(2 * np.pi * freq3 * i / self.sample_rate) * 0.10
-                
-                # Electronic bass line (more prominent)
-                bass_wave = np.sin(2 * np.pi * bass_freq * i / self.sample_rate) * 0.3
-                # Add bass harmonics for richer sound
-                bass_harmonic = np.sin(2 * np.pi * (bass_freq * 2) * i / self.sample_rate) * 0.1
-                
-                # Lead synthesizer melody
-                melody_progress = ((i - start_frame) / self.sample_rate) % (len(music_info['lead_melody']) * beat_duration)
-                melody_index = int(melody_progress / beat_duration)
-                if melody_index < len(music_info['lead_melody']):
-                    lead_freq = music_info['lead_melody'][melody_index]
-                    # Square wave for classic 80s synth sound
-                    lead_wave = np.sign(np.sin(2 * np.pi * lead_freq * i / self.sample_rate)) * 0.15
-                    # Add slight detuning for chorus effect
-                    lead_chorus = np.sign(np.sin(2 * np.pi * (lead_freq * 1.01) * i / self.sample_rate)) * 0.08
-                else:
-                    lead_wave = 0
-                    lead_chorus = 0
-                
-                # Electronic drum pattern
-                beat_progress = ((i - start_frame) / self.sample_rate) % (len(music_info['drum_pattern']) * beat_duration)
-                beat_index = int(beat_progress / beat_duration)
-                if beat_index < len(music_info['drum_pattern']) and music_info['drum_pattern'][beat_index]:
-                    # Kick drum (low frequency pulse)
-                    kick_freq = 60 + 40 * np.sin(i * 0.001)
-                    kick = np.sin(2 * np.pi * kick_freq * i / self.sample_rate) * 0.2
-                    # Hi-hat (high frequency noise)
-                    hihat = np.random.random() * 0.05 if (i % (self.sample_rate // 8)) < (self.sample_rate // 32) else 0
-                else:
-                    kick = 0
-                    hihat = 0
-                
-                # Add subtle filter sweep (classic 80s effect)
-                filter_freq = 0.0001 + 0.00005 * np.sin(i * 0.0001)
-                filter_mod = 0.7 + 0.3 * np.sin(i * filter_freq)
-                
-                # Combine all elements
-                combined = (pad1 + pad2 + pad3 + bass_wave + bass_harmonic + 
-                           lead_wave + lead_chorus + kick + hihat) * self.music_volume
-                
-                # Apply filter and slight reverb effect
-                combined *= filter_mod
-                if i > self.sample_rate // 4:  # Add reverb delay
-                    reverb = arr[i - self.sample_rate // 4][0] * 0.1
-                    combined += reverb
-                
-                arr[i] = [combined, combined]
-        
-        arr = np.clip(arr * 32767, -32767, 32767).astype(np.int16)
-        sound = pygame.sndarray.make_sound(arr)
-        return sound
+            # New Wave style chord pads (softer, more atmospheric)
+            pad1 = self.waveform('background_music', 2 * np.pi * freq1 * i / self.sample_rate) * 0.12
+            pad2 = self.waveform('background_music', 2 * np.pi * freq2 * i / self.sample_rate) * 0.10
+            pad3 = self.waveform('background_music', 2 * np.pi * freq3 * i / self.sample_rate) * 0.10
+            
+            # Electronic bass line (more prominent)
+            bass_wave = self.waveform('background_music', 2 * np.pi * bass_freq * i / self.sample_rate) * 0.3
+            # Add bass harmonics for richer sound
+            bass_harmonic = self.waveform('background_music', 2 * np.pi * (bass_freq * 2) * i / self.sample_rate) * 0.1
+            cells[harmony_key] = pad1 + pad2 + pad3 + bass_wave + bass_harmonic
+        
+        # Lead synthesizer melody - square wave for classic 80s synth sound,
+        # shared by every beat that plays the same note at the same phase
+        lead_origin = self.phase_origin((lead_freq,), beat_start)
+        lead_key = ('lead', lead_freq, lead_origin, beat_frames)
+        if lead_key not in cells:
+            i = np.arange(lead_origin, lead_origin + beat_frames)
+            cells[lead_key] = self.waveform('background_music', 2 * np.pi * lead_freq * i / self.sample_rate,
+                                            'square', lead_freq) * 0.15
+        
+        combined = cells[harmony_key][offset:offset + frames] + cells[lead_key][offset:offset + frames]
+        
+        # Add slight detuning for chorus effect. The detuned phase never lines
+        # up with an earlier beat, so it is rendered in place.
+        i = np.arange(start_frame, end_frame)
+        combined += self.waveform('background_music', 2 * np.pi * (lead_freq * 1.01) * i / self.sample_rate,
+                                  'square', lead_freq * 1.01) * 0.08
+        
+        # Electronic drum pattern
+        if drum_on:
+            # Kick drum (low frequency pulse)
+            combined += self.music_kick_carrier()[start_frame:end_frame] * 0.2
+            # Hi-hat (high frequency noise)
+            hihat_on = (i % (self.sample_rate // 8)) < (self.sample_rate // 32)
+            combined[hihat_on] += self.rng.random(np.count_nonzero(hihat_on)) * 0.05
+        
+        combined *= MUSIC_HEADROOM
+        return combined
+    
+    def music_kick_carrier(self):
+        """Get the kick drum oscillator over a whole track - the same for every theme"""
+        frames = int(self.music_duration * self.sample_rate)
+        wavetable = self.uses_wavetables('background_music')
+        if self.kick_carrier is None or self.kick_carrier[0] != (frames, wavetable):
+            i = np.arange(frames)
+            kick_freq = 60 + 40 * np.sin(i * 0.001)
+            carrier = self.waveform('background_music', 2 * np.pi * kick_freq * i / self.sample_rate)
+            self.kick_carrier = ((frames, wavetable), carrier)
+        return self.kick_carrier[1]
+    
+    def music_filter_sweep(self):
+        """Get the slow filter sweep gain curve (classic 80s effect) over a whole track"""
+        frames = int(self.music_duration * self.sample_rate)
+        if self.filter_sweep_curve is None or len(self.filter_sweep_curve) != frames:
+            i = np.arange(frames)
+            filter_freq = 0.0001 + 0.00005 * np.sin(i * 0.0001)
+            self.filter_sweep_curve = (0.7 + 0.3 * np.sin(i * filter_freq)).astype(dsp.SAMPLE_DTYPE)
+        return self.filter_sweep_curve
+    
+    def music_effects(self):
+        """Create the filter sweep and quarter-second reverb stage for one music track"""
+        reverb = dsp.FeedbackDelay(self.sample_rate // 4, 0.1)
+        return dsp.EffectsStage(self.music_filter_sweep(), reverb)
     
     def generate_ambient_atmosphere(self):
         """Generate subtle electronic ambient atmosphere"""
         if not self.audio_available:
             return None
-            
-        duration = 10.0  # Long ambient loop
-        frames = int(duration * self.sample_rate)
-        arr = np.zeros((frames, 2))
         
-        # Create subtle electronic pad sounds
-        for i in range(frames):
-            # Very low frequency pad
-            pad1 = np.sin(2 * np.pi * 60 * i / self.sample_rate) * 0.1
-            pad2 = np.sin(2 * np.pi * 80 * i / self.sample_rate) * 0.08
-            
-            # Add subtle high frequency sparkle
-            sparkle = np.sin(2 * np.pi * 2000 * i / self.sample_rate) * 0.02 * abs(np.sin(i * 0.001))
-            
-            # Combine with very low volume
-            combined = (pad1 + pad2 + sparkle) * 0.15
-            arr[i] = [combined, combined]
-        
-        arr = (arr * 32767).astype(np.int16)
-        sound = pygame.sndarray.make_sound(arr)
-        return sound
+        return self.cached_sound('ambient', {}, self.render_ambient_atmosphere)
+    
+    def warmup_render(self, asset):
+        """Get the cache name, parameters and render function of a warm-up asset"""
+        if asset == 'ambient':
+            return 'ambient', {}, self.render_ambient_atmosphere
+        if asset == 'fanfare':
+            return 'fanfare', {}, self.render_level_complete_fanfare
+        
+        # Music assets are named 'music_<theme>'
+        theme_num = int(asset.split('_')[1])
+        return ('background_music', self.music_cache_params(theme_num),
+                lambda: self.render_background_music(theme_num))
+    
+    def render_ambient_atmosphere(self):
+        """Render the ambient atmosphere loop as int16 samples"""
+        # Shortest seamless loop: at 22050 Hz the 60 Hz, 80 Hz and 2 kHz tones
+        # repeat every 735, 2205 and 441 samples and the 3.5 Hz sparkle gate
+        # every 3150, so everything lines up after exactly one second
+        frames = self.sample_rate
+        wavetable = self.uses_wavetables('ambient')
+        
+        # Very low frequency pads
+        pad1 = dsp.oscillator(60, frames, self.sample_rate, wavetable=wavetable) * 0.1
+        pad2 = dsp.oscillator(80, frames, self.sample_rate, wavetable=wavetable) * 0.08
+        
+        # Add subtle high frequency sparkle, fading in and out about 7 times a second
+        gate = np.abs(dsp.oscillator(3.5, frames, self.sample_rate))
+        sparkle = dsp.oscillator(2000, frames, self.sample_rate, wavetable=wavetable) * 0.02 * gate
+        
+        # Combine with very low volume
+        return dsp.to_int16(dsp.mix(pad1, pad2, sparkle) * 0.15)
+
+def render_audio_asset(asset, sample_rate):
+    """Render one warm-up asset to int16 samples - runs on a warm-up worker thread"""
+    generator = SoundGenerator()
+    generator.sample_rate = sample_rate
+    _, _, render = generator.warmup_render(asset)
+    return render()
+
+class MusicStream:
+    def __init__(self, sound_generator, level):
+        self.sound_generator = sound_generator
+        theme_num = ((level - 1) % 6) + 1
+        self.music_info = MUSIC_THEMES.get(theme_num, MUSIC_THEMES[1])
+        
+        sample_rate = sound_generator.sample_rate
+        self.total_frames = int(sound_generator.music_duration * sample_rate)
+        chord_duration = sound_generator.music_duration / len(self.music_info['chords'])
+        beat_duration = chord_duration / len(self.music_info['drum_pattern'])
+        self.block_frames = int(beat_duration * sample_rate)  # One drum step per block
+        self.position = 0
+        self.cells = {}  # Beat layers kept for the next time the loop reaches them
+        
+        # Filter sweep and reverb keep their state from one block to the next
+        self.effects = sound_generator.music_effects()
+    
+    def render_next_block(self):
+        """Render the next block of the looping track as int16 samples"""
+        start_frame = self.position
+        end_frame = min(start_frame + self.block_frames, self.total_frames)
+        dry = self.sound_generator.render_music_dry(self.music_info, start_frame, end_frame, self.cells)
+        wet = self.effects.process(dry)
+        
+        # Wrap around to loop the theme. Like the full-length track, the
+        # first quarter second of each loop gets no reverb.
+        self.position = end_frame if end_frame < self.total_frames else 0
+        if self.position == 0:
+            self.effects.reset()
+        
+        return dsp.to_int16(wet)
+
+# Sound effect categories: higher priority voices steal from lower ones, and
+# max_voices caps how many of a category can sound at once
+SFX_VOICE_CATEGORIES = {
+    'fanfare': {'priority': 3, 'max_voices': 1},
+    'power_up': {'priority': 2, 'max_voices': 2},
+    'coily': {'priority': 2, 'max_voices': 1},
+    'cube_change': {'priority': 1, 'max_voices': 2},
+    'hop': {'priority': 1, 'max_voices': 2}
+}
+
+class VoicePool:
+    def __init__(self, first_channel, num_voices, categories=SFX_VOICE_CATEGORIES, monitor=None):
+        self.categories = categories
+        self.monitor = monitor  # AudioLatencyMonitor that played effects are reported to
+        self.play_count = 0  # Orders voices by start time
+        self.dropped = 0  # Effects not played because every voice was busy with something more important
+        self.stolen = 0  # Effects cut off to make room for a new one
+        
+        # Channels are claimed once; each voice remembers what it is playing
+        self.voices = []
+        for channel_num in range(first_channel, first_channel + num_voices):
+            self.voices.append({
+                'channel': audio_backend.channel(channel_num),
+                'category': None,
+                'priority': 0,
+                'started': 0
+            })
+    
+    def play(self, sound, category, pan=0.0, latency=None):
+        """Play a sound effect on a free voice, stealing one if needed"""
+        settings = self.categories.get(category, {'priority': 0, 'max_voices': len(self.voices)})
+        priority = settings['priority']
+        
+        active = [voice for voice in self.voices if voice['channel'].get_busy()]
+        same_category = [voice for voice in active if voice['category'] == category]
+        
+        if len(same_category) >= settings['max_voices']:
+            # At the category limit - restart its oldest voice
+            voice = min(same_category, key=lambda v: v['started'])
+            self.stolen += 1
+        elif len(active) < len(self.voices):
+            voice = next(voice for voice in self.voices if not voice['channel'].get_busy())
+        else:
+            # Every voice is busy - steal the lowest priority, oldest one we outrank or match
+            candidates = [voice for voice in active if voice['priority'] <= priority]
+            if not candidates:
+                self.dropped += 1
+                return None
+            voice = min(candidates, key=lambda v: (v['priority'], v['started']))
+            self.stolen += 1
+        
+        self.play_count += 1
+        voice['category'] = category
+        voice['priority'] = priority
+        voice['started'] = self.play_count
+        voice['channel'].set_volume(*dsp.pan_gains(pan))
+        voice['channel'].play(sound)
+        
+        # The mixer takes it from here, so the output time can only be estimated
+        if latency:
+            self.monitor.started(latency)
+            self.monitor.emitted(latency, *audio_backend.output_time(latency['start']))
+        return voice['channel']
+    
+    def stop(self, category=None):
+        """Stop every voice, or only the voices of one category"""
+        for voice in self.voices:
+            if category is None or voice['category'] == category:
+                voice['channel'].stop()
+
+class MixerBus:
+    def __init__(self, channel, sample_rate, block_frames=512, monitor=None):
+        self.channel = channel
+        self.monitor = monitor  # AudioLatencyMonitor that mixed effects are reported to
+        self.sample_rate = sample_rate
+        self.block_frames = block_frames
+        
+        # Effects start a fixed two blocks after they are requested: far enough
+        # ahead that the block they land in has not been mixed yet
+        self.latency_frames = 2 * block_frames
+        
+        self.voices = []
+        self.mono_samples = {}  # Float copy of each sound, made on its first play
+        self.next_block_frame = 0  # Bus frame at the start of the next block to mix
+        self.clock_start = None  # perf_counter() time at bus frame 0
+        
+        # Mixing cost and load
+        self.blocks_mixed = 0
+        self.mix_seconds = 0.0
+        self.peak_voices = 0
+        self.underruns = 0
+    
+    def current_frame(self):
+        """Get the bus frame that is playing right now"""
+        import time
+        if self.clock_start is None:
+            return self.next_block_frame
+        return int((time.perf_counter() - self.clock_start) * self.sample_rate)
+    
+    def play(self, sound, category, pan=0.0, latency=None):
+        """Schedule a sound effect a fixed latency after now, with its volume as gain"""
+        if sound not in self.mono_samples:
+            self.mono_samples[sound] = audio_backend.sound_array(sound)[:, 0] / 32767.0
+        
+        start_frame = max(self.current_frame() + self.latency_frames, self.next_block_frame)
+        left, right = dsp.pan_gains(pan)
+        gain = sound.get_volume()
+        self.voices.append({
+            'samples': self.mono_samples[sound],
+            'category': category,
+            'start_frame': start_frame,
+            'left': gain * left,
+            'right': gain * right,
+            'latency': latency
+        })
+        self.peak_voices = max(self.peak_voices, len(self.voices))
+        if latency:
+            self.monitor.started(latency)
+        return self.channel
+    
+    def stop(self, category=None):
+        """Stop every voice, or only the voices of one category"""
+        self.voices = [voice for voice in self.voices
+                       if category is not None and voice['category'] != category]
+    
+    def mix_block(self):
+        """Sum every active voice into the next block of int16 stereo samples"""
+        import time
+        started = time.perf_counter()
+        
+        block_start = self.next_block_frame
+        block_end = block_start + self.block_frames
+        out = np.zeros((self.block_frames, 2))
+        
+        still_playing = []
+        for voice in self.voices:
+            samples = voice['samples']
+            offset = max(0, voice['start_frame'] - block_start)
+            if offset < self.block_frames:
+                source_start = block_start + offset - voice['start_frame']
+                source_end = min(len(samples), source_start + self.block_frames - offset)
+                segment = samples[source_start:source_end]
+                out[offset:offset + len(segment), 0] += segment * voice['left']
+                out[offset:offset + len(segment), 1] += segment * voice['right']
+                
+                # First block with this voice in it - it plays when the bus clock reaches it
+                if source_start == 0 and voice['latency']:
+                    emit_time = self.clock_start + voice['start_frame'] / self.sample_rate
+                    self.monitor.emitted(voice['latency'], emit_time, self.blocks_mixed)
+            if voice['start_frame'] + len(samples) > block_end:
+                still_playing.append(voice)
+        self.voices = still_playing
+        
+        self.next_block_frame = block_end
+        arr = np.clip(out * 32767, -32767, 32767).astype(np.int16)
+        
+        self.blocks_mixed += 1
+        self.mix_seconds += time.perf_counter() - started
+        return arr
+    
+    def update(self):
+        """Keep one mixed block queued behind the block that is playing"""
+        import time
+        if not self.channel.get_busy():
+            # Starting up, or the game stalled long enough to drain the bus -
+            # restart the clock so the block about to play is "now"
+            if self.clock_start is not None:
+                self.underruns += 1
+            self.clock_start = time.perf_counter() - self.next_block_frame / self.sample_rate
+            self.channel.play(audio_backend.make_sound(self.mix_block()))
+        if self.channel.get_queue() is None:
+            # The last block mixed has just started playing. If the output runs
+            # faster or slower than perf_counter(), pull the clock back inside it.
+            playing_start = self.next_block_frame - self.block_frames
+            now_frame = self.current_frame()
+            clamped_frame = min(max(now_frame, playing_start), self.next_block_frame)
+            self.clock_start += (now_frame - clamped_frame) / self.sample_rate
+            self.channel.queue(audio_backend.make_sound(self.mix_block()))
+    
+    def mix_cost_ms(self):
+        """Get the average time spent mixing one block, in milliseconds"""
+        return 1000 * self.mix_seconds / self.blocks_mixed if self.blocks_mixed else 0.0
+
+class AudioLatencyMonitor:
+    def __init__(self, log_enabled=LATENCY_LOGGING):
+        self.event_time = None  # When the game event being handled happened
+        self.log_enabled = log_enabled
+        self.log_file = None
+        
+        # Counts per LATENCY_BUCKETS_MS bucket, plus totals for the mean, per stage.
+        # Only event_to_start is measured - emit times are modelled from the output
+        # buffer (or the bus clock), so the stages ending there are estimates.
+        self.estimated_stages = ('start_to_emit', 'event_to_emit')
+        self.stages = {}
+        for stage in ('event_to_start', 'start_to_emit', 'event_to_emit'):
+            self.stages[stage] = {
+                'counts': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                'total_ms': 0.0,
+                'max_ms': 0.0
+            }
+    
+    def mark_event(self, event_time=None):
+        """Timestamp a game event, now or at an earlier perf_counter() time - sounds played until clear_event() are timed from it"""
+        import time
+        self.event_time = event_time if event_time is not None else time.perf_counter()
+    
+    def clear_event(self):
+        """Time sounds from the moment they are played again"""
+        self.event_time = None
+    
+    def begin(self, name):
+        """Open a latency record for a sound about to be played"""
+        import time
+        event_time = self.event_time if self.event_time is not None else time.perf_counter()
+        return {'name': name, 'event': event_time, 'start': None, 'emit': None, 'block': None}
+    
+    def started(self, record):
+        """Record that a sound has been handed to its channel or the mixer bus"""
+        import time
+        record['start'] = time.perf_counter()
+        self.add('event_to_start', record['start'] - record['event'])
+    
+    def emitted(self, record, emit_time, block=None):
+        """Record when a sound reaches the output, and in which output block if known"""
+        record['emit'] = emit_time
+        record['block'] = block
+        self.add('start_to_emit', emit_time - record['start'])
+        self.add('event_to_emit', emit_time - record['event'])
+        if self.log_enabled:
+            self.log(record)
+    
+    def add(self, stage, seconds):
+        """Count one latency measurement in a stage's histogram"""
+        import bisect
+        ms = max(0.0, seconds * 1000)
+        histogram = self.stages[stage]
+        histogram['counts'][bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        histogram['total_ms'] += ms
+        histogram['max_ms'] = max(histogram['max_ms'], ms)
+    
+    def mean_ms(self, stage):
+        """Get the mean latency of a stage in milliseconds"""
+        histogram = self.stages[stage]
+        count = sum(histogram['counts'])
+        return histogram['total_ms'] / count if count else 0.0
+    
+    def stage_title(self, stage):
+        """Get a stage's display name, marking the estimated ones"""
+        title = stage.replace('_to_', '->')
+        return title + " (est.)" if stage in self.estimated_stages else title
+    
+    def bucket_labels(self):
+        """Get a short label for every histogram bucket"""
+        return [f"<{edge}" for edge in LATENCY_BUCKETS_MS] + [f"{LATENCY_BUCKETS_MS[-1]}+"]
+    
+    def log(self, record):
+        """Append one sound's timings to the latency log"""
+        if self.log_file is None:
+            self.log_file = open(AUDIO_LATENCY_LOG, 'a')
+            self.log_file.write(f"# audio latency log, mixer buffer {MIXER_BUFFER_FRAMES} frames, "
+                                f"{type(audio_backend).__name__}; emit times (~) are estimates, not measured\n")
+        block = record['block'] if record['block'] is not None else '-'
+        self.log_file.write(f"{record['name']:<12} event->start {(record['start'] - record['event']) * 1000:7.2f} ms  "
+                            f"start->emit~ {(record['emit'] - record['start']) * 1000:7.2f} ms  "
+                            f"event->emit~ {(record['emit'] - record['event']) * 1000:7.2f} ms  block {block}\n")
+    
+    def close_log(self):
+        """Write the histograms to the end of the log and close it"""
+        if self.log_file is None:
+            return
+        labels = self.bucket_labels()
+        for stage, histogram in self.stages.items():
+            buckets = "  ".join(f"{label} ms: {count}" for label, count in zip(labels, histogram['counts']))
+            self.log_file.write(f"# {self.stage_title(stage)} mean {self.mean_ms(stage):.2f} ms max {histogram['max_ms']:.2f} ms  {buckets}\n")
+        self.log_file.close()
+        self.log_file = None
 
 class AudioManager:
-    def __init__(self, sound_generator):
+    def __init__(self, sound_generator, streaming_music=MUSIC_STREAMING, software_mixer=SOFTWARE_MIXER):
         self.sound_generator = sound_generator
         self.current_music = None
         self.current_ambient = None
         self.current_level = 0
         self.music_channel = None
         self.ambient_channel = None
+        self.voice_pool = None
+        self.mixer_bus = None
+        
+        # Audio rendered ahead of time by worker threads or processes, keyed by asset name
+        import queue
+        self.music_sounds = {}
+        self.ambient_sound = None
+        self.renders_in_flight = set()
+        self.finished_renders = queue.Queue()
+        self.pending_music_theme = None  # Theme waiting for its render to finish
+        self.ambient_pending = False  # Ambient loop waiting for its render to finish
+        
+        # Startup warm-up progress
+        self.warmup_total = 0
+        self.warmup_remaining = set()
+        
+        # Streaming mode renders one block at a time and queues it behind the playing one
+        self.streaming_music = streaming_music
+        self.music_stream = None
         
         # Initialize pygame mixer channels
         if sound_generator.audio_available:
-            pygame.mixer.set_num_channels(8)  # More channels for layered audio
-            self.music_channel = pygame.mixer.Channel(0)
-            self.ambient_channel = pygame.mixer.Channel(1)
+            audio_backend.set_num_channels(8)  # More channels for layered audio
+            audio_backend.set_reserved(8)  # Every channel is handed out here, never by Sound.play()
+            self.music_channel = audio_backend.channel(0)
+            self.ambient_channel = audio_backend.channel(1)
+            self.music_channel.set_volume(self.music_gain())
+            
+            if software_mixer and audio_backend.mixer_frequency() != sound_generator.sample_rate:
+                # The bus clock counts frames at the synthesis rate, so it would drift on any other
+                print(f"Software mixer needs the mixer at {sound_generator.sample_rate} Hz, "
+                      f"not {audio_backend.mixer_frequency()} Hz - using the voice pool")
+                software_mixer = False
+            
+            if software_mixer:
+                # Every effect is summed into one stream on the next channel
+                self.mixer_bus = MixerBus(audio_backend.channel(2), sound_generator.sample_rate,
+                                          monitor=sound_generator.latency)
+                self.voice_pool = self.mixer_bus
+            else:
+                # Sound effects share the remaining channels
+                self.voice_pool = VoicePool(first_channel=2, num_voices=6, monitor=sound_generator.latency)
+            sound_generator.voice_pool = self.voice_pool
     
+    def start_warmup(self):
+        """Render every music theme, the ambient loop and the fanfare ahead of gameplay"""
+        if not self.sound_generator.audio_available:
+            return
+        
+        import concurrent.futures
+        import functools
+        
+        # Slowest renders first so they are not left running alone at the end
+        assets = ['ambient']
+        if not self.streaming_music:
+            assets += [f'music_{theme_num}' for theme_num in MUSIC_THEMES]
+        assets.append('fanfare')
+        
+        # Anything already in the disk cache only needs to be memory-mapped
+        misses = []
+        for asset in assets:
+            name, params, _ = self.sound_generator.warmup_render(asset)
+            key = self.sound_generator.cache_key(name, params)
+            samples = self.sound_generator.cache.load(key)
+            if samples is not None:
+                self.install_asset(asset, samples)
+            elif asset not in self.renders_in_flight:
+                misses.append((asset, key))
+        
+        self.warmup_total = len(assets)
+        self.warmup_remaining = set(asset for asset, _ in misses)
+        
+        if misses:
+            # Threads, not processes: forking would copy SDL's audio thread and the
+            # prefetch threads mid-flight, and the NumPy kernels release the GIL anyway
+            workers = min(os.cpu_count() or 1, len(misses))
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+            
+            for asset, key in misses:
+                self.renders_in_flight.add(asset)
+                future = executor.submit(render_audio_asset, asset, self.sound_generator.sample_rate)
+                future.add_done_callback(functools.partial(self.warmup_render_done, asset, key))
+            executor.shutdown(wait=False)  # Workers exit once the queue is empty
+        
+        # The remaining sound effects are short enough to render right here
+        self.sound_generator.preload_sfx([name for name in self.sound_generator.sfx_generators
+                                          if name != 'fanfare'])
+    
+    def warmup_render_done(self, asset, key, future):
+        """Cache a finished warm-up render and hand it to the game thread"""
+        try:
+            samples = future.result()
+            self.sound_generator.cache.store(key, samples)
+        except Exception as e:
+            print(f"Could not pre-render {asset}: {e}")
+            samples = None
+        self.finished_renders.put((asset, samples))
+    
+    def warmup_progress(self):
+        """Get the number of warm-up assets finished and the total"""
+        return self.warmup_total - len(self.warmup_remaining), self.warmup_total
+    
+    def install_asset(self, asset, samples):
+        """Turn rendered samples into a Sound and put it where the game looks for it"""
+        sound = audio_backend.make_sound(samples)
+        if asset == 'ambient':
+            self.ambient_sound = sound
+            if self.ambient_pending:
+                self.play_ambient_atmosphere()
+        elif asset == 'fanfare':
+            self.sound_generator.add_sfx('fanfare', sound)
+        else:
+            theme_num = int(asset.split('_')[1])
+            self.music_sounds[theme_num] = sound
+            if theme_num == self.pending_music_theme:
+                self.start_music(theme_num)
+
     def play_background_music(self, level):
         """Play background music for the current level theme"""
         if not self.sound_generator.audio_available:
             return
-            
+        
         # Only change music if level theme changed
         theme_num = ((level - 1) % 6) + 1
         current_theme = ((self.current_level - 1) % 6) + 1 if self.current_level > 0 else 0
         
         if theme_num != current_theme:
-            # Stop current music
-            if self.music_channel and self.music_channel.get_busy():
-                self.music_channel.stop()
-            
-            # Generate and play new music
-            music = self.sound_generator.generate_background_music(level)
-            if music:
-                self.current_music = music
-                self.current_level = level
-                if self.music_channel:
-                    self.music_channel.play(music, loops=-1)  # Loop indefinitely
+            self.current_level = level
+            
+            if self.streaming_music:
+                self.start_music_stream(level)
+                return
+            
+            if theme_num in self.music_sounds:
+                self.start_music(theme_num)
+            else:
+                # Not rendered yet - keep the frame moving and switch once the worker finishes
+                self.pending_music_theme = theme_num
+                self.prefetch_music(level)
+            
+            # Render the following level's theme while this one plays
+            self.prefetch_music(level + 1)
+    
+    def start_music(self, theme_num):
+        """Switch the music channel to a rendered theme"""
+        # Stop current music
+        if self.music_channel and self.music_channel.get_busy():
+            self.music_channel.stop()
+        
+        music = self.music_sounds[theme_num]
+        self.current_music = music
+        self.pending_music_theme = None
+        if self.music_channel:
+            self.music_channel.play(music, loops=-1)  # Loop indefinitely
+    
+    def start_music_stream(self, level):
+        """Start streaming a theme block by block through the music channel"""
+        # Stop current music
+        if self.music_channel and self.music_channel.get_busy():
+            self.music_channel.stop()
+        
+        self.current_music = None
+        self.music_stream = MusicStream(self.sound_generator, level)
+        if self.music_channel:
+            first_block = audio_backend.make_sound(self.music_stream.render_next_block())
+            self.music_channel.play(first_block)  # The next update() queues the block after it
+    
+    def queue_music_block(self):
+        """Keep one rendered block queued behind the block that is playing"""
+        if self.music_stream and self.music_channel and self.music_channel.get_queue() is None:
+            block = audio_backend.make_sound(self.music_stream.render_next_block())
+            self.music_channel.queue(block)
     
+    def prefetch_music(self, level):
+        """Start rendering a level's music theme on a worker thread"""
+        if not self.sound_generator.audio_available:
+            return
+        
+        theme_num = ((level - 1) % 6) + 1
+        asset = f'music_{theme_num}'
+        if theme_num in self.music_sounds or asset in self.renders_in_flight:
+            return
+        
+        import threading
+        self.renders_in_flight.add(asset)
+        worker = threading.Thread(target=self.render_music_worker, args=(theme_num,), daemon=True)
+        worker.start()
+    
+    def render_music_worker(self, theme_num):
+        """Render a theme's samples off the game thread and hand them back through a queue"""
+        try:
+            samples = self.sound_generator.background_music_samples(theme_num)
+        except Exception as e:
+            print(f"Could not pre-render music: {e}")
+            samples = None
+        self.finished_renders.put((f'music_{theme_num}', samples))
+    
+    def update(self):
+        """Collect finished renders and start any music that was waiting for one"""
+        import queue
+        while True:
+            try:
+                asset, samples = self.finished_renders.get_nowait()
+            except queue.Empty:
+                break
+            
+            self.renders_in_flight.discard(asset)
+            self.warmup_remaining.discard(asset)
+            if samples is not None:
+                self.install_asset(asset, samples)
+        
+        # Top up the streaming queues
+        self.queue_music_block()
+        if self.mixer_bus:
+            self.mixer_bus.update()
+
     def play_ambient_atmosphere(self):
         """Play subtle ambient atmosphere"""
         if not self.sound_generator.audio_available:
             return
             
         if not self.ambient_channel or not self.ambient_channel.get_busy():
-            ambient = self.sound_generator.generate_ambient_atmosphere()
+            if self.ambient_sound is None and 'ambient' in self.renders_in_flight:
+                # Still warming up - start it once the render arrives
+                self.ambient_pending = True
+                return
+            
+            if self.ambient_sound is None:
+                self.ambient_sound = self.sound_generator.generate_ambient_atmosphere()
+            ambient = self.ambient_sound
+            self.ambient_pending = False
             if ambient and self.ambient_channel:
                 self.current_ambient = ambient
                 self.ambient_channel.play(ambient, loops=-1)  # Loop indefinitely
@@ -1451,11 +2549,8 @@ class AudioManager:
         if self.music_channel and self.music_channel.get_busy():
             self.music_channel.pause()
         
-        fanfare = self.sound_generator.generate_level_complete_fanfare()
-        if fanfare:
-            # Play fanfare on a separate channel
-            fanfare_channel = pygame.mixer.Channel(2)
-            fanfare_channel.play(fanfare)
+        if self.sound_generator.get_sfx('fanfare'):
+            self.sound_generator.play_sfx('fanfare')
             
             # Resume background music after fanfare (2 seconds)
             pygame.time.set_timer(pygame.USEREVENT + 1, 2000)
@@ -1470,10 +2565,7 @@ class AudioManager:
         if not self.sound_generator.audio_available:
             return
             
-        power_up_sound = self.sound_generator.generate_power_up_sound()
-        if power_up_sound:
-            # Play on available channel
-            pygame.mixer.Channel(3).play(power_up_sound)
+        self.sound_generator.play_sfx('power_up')
     
     def play_enemy_sound(self, enemy_type):
         """Play enemy-specific sound"""
@@ -1481,26 +2573,33 @@ class AudioManager:
             return
             
         if enemy_type == "coily":
-            enemy_sound = self.sound_generator.generate_coily_sound()
-            if enemy_sound:
-                pygame.mixer.Channel(4).play(enemy_sound)
+            self.sound_generator.play_sfx('coily')
     
     def stop_all_music(self):
         """Stop all background music and ambient sounds"""
+        self.music_stream = None
+        self.ambient_pending = False
         if self.music_channel:
             self.music_channel.stop()
         if self.ambient_channel:
             self.ambient_channel.stop()
     
+    def music_gain(self):
+        """Get the music channel gain for the music volume - volumes above the headroom saturate at unity"""
+        return min(1.0, self.sound_generator.music_volume / MUSIC_HEADROOM)
+    
     def set_music_volume(self, volume):
-        """Set background music volume (0.0 to 1.0)"""
+        """Set background music volume (0.0 to 1.0, saturating above 0.9), taking effect immediately"""
         self.sound_generator.music_volume = volume
         if self.music_channel:
-            self.music_channel.set_volume(volume)
+            self.music_channel.set_volume(self.music_gain())
     
     def set_sfx_volume(self, volume):
-        """Set sound effects volume (0.0 to 1.0)"""
+        """Set sound effects volume (0.0 to 1.0), taking effect immediately"""
         self.sound_generator.sfx_volume = volume
+        for sound in list(self.sound_generator.sfx_bank.values()) + list(self.sound_generator.sfx_variants.values()):
+            if sound:
+                sound.set_volume(volume)
 
 class ProgressionSystem:
     def __init__(self):
@@ -1833,6 +2932,102 @@ class ProgressionSystem:
         """Get unlocked achievements"""
         return self.data["achievements"]
 
+class CubeSpriteAtlas:
+    def __init__(self):
+        # (color scheme, step, complete, explosion size, cube size) -> pre-rendered cube
+        self.sprites = {}
+    
+    def key(self, cube, step, is_complete, explosion_size):
+        """Get the atlas key of a cube's appearance"""
+        # Color schemes are long-lived dicts, so their identity names them
+        return (id(cube.color_scheme), step, is_complete, explosion_size, cube.cube_size)
+    
+    def get(self, cube, step, is_complete, explosion_size):
+        """Get a cube sprite, rendering it if this appearance has not been seen yet"""
+        key = self.key(cube, step, is_complete, explosion_size)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = cube.render_sprite(step, is_complete, explosion_size)
+            self.sprites[key] = sprite
+        return sprite
+    
+    def build(self, cube):
+        """Render every step and explosion frame of a cube's color scheme ahead of drawing"""
+        for step in range(len(cube.step_colors)):
+            is_complete = step >= cube.max_steps
+            # Stepping on a cube advances it, so an untouched cube never explodes
+            explosion_sizes = range(cube.explosion_radius + 1) if step > 0 else [0]
+            for explosion_size in explosion_sizes:
+                self.get(cube, step, is_complete, explosion_size)
+    
+    def clear(self):
+        """Drop every sprite, e.g. before building the next level's schemes"""
+        self.sprites.clear()
+
+# Shared by every cube, since cubes of one level look alike
+cube_sprites = CubeSpriteAtlas()
+
+class PyramidLayer:
+    def __init__(self, width, height):
+        # The drawn pyramid, kept between frames and patched where cubes change
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.dirty = set()  # Cubes that changed look or position since the last update
+        self.drawn_rects = {}  # Cube -> where it was last drawn on the layer
+        self.bounds = pygame.Rect(0, 0, 0, 0)  # Area covered by the pyramid
+        self.cubes_redrawn = 0
+        self.changed_rects = []  # Areas redrawn since they were last taken for presenting
+    
+    def mark_dirty(self, cube):
+        """Have a cube redrawn, with everything it overlaps, on the next update"""
+        self.dirty.add(cube)
+    
+    def reset(self, pyramid):
+        """Start over with a new pyramid, drawing every cube on the next update"""
+        self.surface.fill((0, 0, 0, 0))
+        self.drawn_rects.clear()
+        self.dirty = {cube for row in pyramid for cube in row}
+    
+    def update(self, pyramid):
+        """Redraw the layer under every dirty cube's old and new position, back to front"""
+        if not self.dirty:
+            return
+        
+        rects = []
+        for cube in self.dirty:
+            if cube in self.drawn_rects:
+                rects.append(self.drawn_rects[cube])
+            rects.append(cube.sprite_rect())
+        
+        # Clear each area and redraw every cube reaching into it, clipped to the area
+        cubes = [cube for row in pyramid for cube in row]
+        self.changed_rects.extend(rects)
+        for rect in rects:
+            self.surface.set_clip(rect)
+            self.surface.fill((0, 0, 0, 0))
+            for cube in cubes:
+                if rect.colliderect(cube.sprite_rect()):
+                    cube.draw(self.surface)
+                    self.cubes_redrawn += 1
+        self.surface.set_clip(None)
+        
+        for cube in self.dirty:
+            self.drawn_rects[cube] = cube.sprite_rect()
+        drawn = list(self.drawn_rects.values())
+        self.bounds = drawn[0].unionall(drawn[1:])
+        self.dirty.clear()
+    
+    def take_changed_rects(self):
+        """Get the areas redrawn since the last call"""
+        rects, self.changed_rects = self.changed_rects, []
+        return rects
+    
+    def draw(self, screen, offset=(0, 0)):
+        """Blit the pyramid onto a surface in one go"""
+        screen.blit(self.surface, self.bounds.move(offset), self.bounds)
+
+# The pyramid in play draws into this layer
+pyramid_layer = PyramidLayer(SCREEN_WIDTH, SCREEN_HEIGHT)
+
 class Cube:
     def __init__(self, row, col, x, y, sound_generator, level=1, progression_system=None):
         self.row = row
@@ -1865,6 +3060,7 @@ class Cube:
         # Explosion effect
         self.explosion_timer = 0
         self.explosion_duration = 300  # 300ms explosion effect
+        self.explosion_radius = 20  # Size of the outer ring as the explosion starts
         self.is_exploding = False
         
     def generate_step_colors(self):
@@ -1929,6 +3125,8 @@ class Cube:
         self.current_step = 0
         self.is_complete = False
         self.step_colors = self.generate_step_colors()
+        cube_sprites.build(self)
+        pyramid_layer.mark_dirty(self)
         
         # Update current colors
         self.top_color = self.step_colors[self.current_step]['top']
@@ -1956,6 +3154,7 @@ class Cube:
             # Start explosion effect
             self.is_exploding = True
             self.explosion_timer = pygame.time.get_ticks()
+            pyramid_layer.mark_dirty(self)
             
             # Add particle effects
             if particle_system:
@@ -1969,10 +3168,9 @@ class Cube:
                 intensity = 3 if self.is_complete else 2
                 screen_shake.add_shake(10, intensity)
             
-            # Play cube change sound if available
-            cube_sound = self.sound_generator.generate_cube_change_sound()
-            if cube_sound:
-                cube_sound.play()
+            # Play cube change sound if available, rising with each step
+            pitch = self.sound_generator.sfx_pitch(self.level, self.current_step)
+            self.sound_generator.play_sfx('cube_change', pitch=pitch)
             
             return True
         return False
@@ -1980,19 +3178,34 @@ class Cube:
     def update(self):
         """Update explosion animation"""
         if self.is_exploding:
+            # The rings shrink every frame, and the last frame has to be cleared
+            pyramid_layer.mark_dirty(self)
             current_time = pygame.time.get_ticks()
             if current_time - self.explosion_timer > self.explosion_duration:
                 self.is_exploding = False
     
-    def draw(self, screen):
-        """Draw the cube in proper 3D with connected appearance"""
+    def sprite_bounds(self):
+        """Get the cube's base point inside its sprite and the sprite size, with room for glow and edges"""
+        glow_size = 31  # Largest completion glow ring
+        half_height = self.cube_height // 2
+        origin_x = max(self.cube_size // 2, glow_size) + 3
+        origin_y = max(self.cube_height, half_height + glow_size) + 3
+        return origin_x, origin_y, 2 * origin_x, origin_y + max(half_height, glow_size - half_height) + 3
+    
+    def render_sprite(self, step, is_complete, explosion_size):
+        """Render the cube at one step, completion and explosion size onto a transparent sprite"""
         # Calculate 3D cube dimensions
         w = self.cube_size
         h = self.cube_height
+        colors = self.step_colors[step]
+        
+        # Base position inside the sprite
+        base_x, base_y, width, height = self.sprite_bounds()
         
-        # Base position
-        base_x = self.x
-        base_y = self.y
+        # Transparent pixels carry the glow color, so glows blended over them keep their hue
+        glow_color = self.color_scheme['target_top'] if is_complete else colors['top']
+        sprite = pygame.Surface((width, height), pygame.SRCALPHA)
+        sprite.fill((*glow_color, 0))
         
         # 3D cube vertices
         # Top face vertices (rhombus)
@@ -2020,49 +3233,44 @@ class Cube:
         ]
         
         # Draw explosion effect if active
-        if self.is_exploding:
-            current_time = pygame.time.get_ticks()
-            progress = (current_time - self.explosion_timer) / self.explosion_duration
-            
+        if explosion_size > 0:
             # Create pulsing explosion effect with level-specific colors
-            explosion_size = int(20 * (1 - progress))
-            if explosion_size > 0:
-                explosion_colors = self.color_scheme['explosion_colors']
-                for i, color in enumerate(explosion_colors):
-                    size = explosion_size - i * 3
-                    if size > 0:
-                        pygame.draw.circle(screen, color, (int(base_x), int(base_y - h//2)), size)
+            explosion_colors = self.color_scheme['explosion_colors']
+            for i, color in enumerate(explosion_colors):
+                size = explosion_size - i * 3
+                if size > 0:
+                    pygame.draw.circle(sprite, color, (int(base_x), int(base_y - h//2)), size)
         
         # Draw the cube faces in correct order (back to front)
         
         # 1. Draw right face (back-right)
-        pygame.draw.polygon(screen, self.right_color, right_vertices)
+        pygame.draw.polygon(sprite, colors['right'], right_vertices)
         
         # 2. Draw left face (back-left)  
-        pygame.draw.polygon(screen, self.left_color, left_vertices)
+        pygame.draw.polygon(sprite, colors['left'], left_vertices)
         
         # 3. Draw top face (front)
-        pygame.draw.polygon(screen, self.top_color, top_vertices)
+        pygame.draw.polygon(sprite, colors['top'], top_vertices)
         
         # Draw sharp edges for 3D effect
-        pygame.draw.polygon(screen, self.edge_color, top_vertices, 3)
-        pygame.draw.polygon(screen, self.edge_color, left_vertices, 2)
-        pygame.draw.polygon(screen, self.edge_color, right_vertices, 2)
+        pygame.draw.polygon(sprite, colors['edge'], top_vertices, 3)
+        pygame.draw.polygon(sprite, colors['edge'], left_vertices, 2)
+        pygame.draw.polygon(sprite, colors['edge'], right_vertices, 2)
         
         # Add connecting lines between faces for solid 3D look
         # Vertical edges
-        pygame.draw.line(screen, self.edge_color, 
+        pygame.draw.line(sprite, colors['edge'], 
                         (base_x - w//2, base_y - h//2), 
                         (base_x - w//2, base_y), 2)
-        pygame.draw.line(screen, self.edge_color, 
+        pygame.draw.line(sprite, colors['edge'], 
                         (base_x + w//2, base_y - h//2), 
                         (base_x + w//2, base_y), 2)
-        pygame.draw.line(screen, self.edge_color, 
+        pygame.draw.line(sprite, colors['edge'], 
                         (base_x, base_y), 
                         (base_x, base_y + h//2), 2)
         
         # Add intense neon glow for activated cubes
-        if self.is_complete:
+        if is_complete:
             # Multiple glow layers for intense effect using level colors
             target_color = self.color_scheme['target_top']
             for i in range(3):
@@ -2071,16 +3279,38 @@ class Cube:
                 glow_surf = pygame.Surface((glow_size * 2, glow_size * 2), pygame.SRCALPHA)
                 pygame.draw.circle(glow_surf, (*target_color, alpha), 
                                  (glow_size, glow_size), glow_size)
-                screen.blit(glow_surf, (int(base_x - glow_size), int(base_y - h//2 - glow_size)))
+                sprite.blit(glow_surf, (int(base_x - glow_size), int(base_y - h//2 - glow_size)))
             
             # Sharp highlight on edges
-            pygame.draw.polygon(screen, WHITE, top_vertices, 1)
-        elif self.current_step > 0:
+            pygame.draw.polygon(sprite, WHITE, top_vertices, 1)
+        elif step > 0:
             # Partial glow for intermediate steps
-            current_color = self.top_color
+            current_color = colors['top']
             glow_surf = pygame.Surface((30, 30), pygame.SRCALPHA)
             pygame.draw.circle(glow_surf, (*current_color, 40), (15, 15), 15)
-            screen.blit(glow_surf, (int(base_x - 15), int(base_y - h//2 - 15)))
+            sprite.blit(glow_surf, (int(base_x - 15), int(base_y - h//2 - 15)))
+        
+        if pygame.display.get_surface():
+            sprite = sprite.convert_alpha()
+        return sprite
+    
+    def explosion_size(self):
+        """Get the radius of the explosion rings at this point of the explosion, 0 once it is over"""
+        if not self.is_exploding:
+            return 0
+        progress = (pygame.time.get_ticks() - self.explosion_timer) / self.explosion_duration
+        return min(self.explosion_radius, max(0, int(self.explosion_radius * (1 - progress))))
+    
+    def sprite_rect(self):
+        """Get the screen area the cube's sprite covers"""
+        origin_x, origin_y, width, height = self.sprite_bounds()
+        return pygame.Rect(int(self.x) - origin_x, int(self.y) - origin_y, width, height)
+    
+    def draw(self, screen):
+        """Draw the cube in proper 3D with connected appearance, from the sprite atlas"""
+        step = min(self.current_step, len(self.step_colors) - 1)
+        sprite = cube_sprites.get(self, step, self.is_complete, self.explosion_size())
+        screen.blit(sprite, self.sprite_rect())
 
 class HomeScreen:
     def __init__(self, width, height):
@@ -2090,6 +3320,7 @@ class HomeScreen:
         self.title_pulse = 0
         self.subtitle_pulse = 0
         self.instruction_pulse = 0
+        self.loading_progress = (0, 0)  # Audio assets warmed up, out of total
         
     def update(self):
         """Update home screen animations"""
@@ -2216,9 +3447,27 @@ class HomeScreen:
                              self.width // 2, self.height // 2 + 80, 
                              40, instruction_color)
         
+        # Show audio warm-up progress until every asset is ready
+        loaded, total = self.loading_progress
+        if loaded < total:
+            self.draw_loading_bar(screen, loaded, total)
+        
         # Draw additional retro elements
         self.draw_retro_elements(screen)
     
+    def draw_loading_bar(self, screen, loaded, total):
+        """Draw the audio warm-up progress bar"""
+        bar_width = 300
+        bar_height = 10
+        x = self.width // 2 - bar_width // 2
+        y = self.height // 2 + 140
+        
+        pygame.draw.rect(screen, NEON_PURPLE, (x, y, bar_width, bar_height), 1)
+        pygame.draw.rect(screen, NEON_CYAN, (x + 2, y + 2, int((bar_width - 4) * loaded / total), bar_height - 4))
+        self.draw_simple_text(screen, f"LOADING AUDIO {loaded}/{total}", 
+                             self.width // 2, y + 30, 
+                             24, NEON_CYAN)
+    
     def draw_retro_elements(self, screen):
         """Draw additional 80s retro elements"""
         # Draw corner decorations
@@ -2372,6 +3621,7 @@ class QBert:
         self.x = 0
         self.y = 0
         self.last_move_time = 0
+        self.move_event_time = None  # perf_counter() of the key press behind the current hop, for sound latency
         self.move_delay = 400  # Milliseconds between moves (increased for hop animation)
         self.sound_generator = sound_generator
         
@@ -2493,6 +3743,7 @@ class QBert:
             if elapsed >= self.hop_duration:
                 # Hop finished
                 self.is_hopping = False
+                self.move_event_time = None
                 self.x = self.target_x
                 self.y = self.target_y
             else:
@@ -2509,7 +3760,7 @@ class QBert:
         
         return None
     
-    def start_hop(self, target_x, target_y):
+    def start_hop(self, target_x, target_y, level=1):
         """Start a hop animation to target position"""
         self.is_hopping = True
         self.hop_start_time = pygame.time.get_ticks()
@@ -2518,10 +3769,8 @@ class QBert:
         self.target_x = target_x
         self.target_y = target_y
         
-        # Play hop sound if available
-        hop_sound = self.sound_generator.generate_hop_sound()
-        if hop_sound:
-            hop_sound.play()
+        # Play hop sound if available, pitched for the level
+        self.sound_generator.play_sfx('hop', pitch=self.sound_generator.sfx_pitch(level))
     
     def move(self, direction, pyramid, particle_system=None, screen_shake=None):
         """Move Q-Bert in the specified direction with hopping animation"""
@@ -2554,7 +3803,7 @@ class QBert:
             target_y = target_cube.y - 40  # Updated for larger cubes
             
             # Start hop animation
-            self.start_hop(target_x, target_y)
+            self.start_hop(target_x, target_y, target_cube.level)
             
             # Update logical position
             self.row = new_row
@@ -2711,16 +3960,70 @@ class QBert:
                 end_y = self.y + math.sin(angle) * (body_size + 15)
                 pygame.draw.line(screen, (255, 255, 0, 150), 
                                (int(start_x), int(start_y)), (int(end_x), int(end_y)), 2)
+    
+    def dirty_rect(self):
+        """Get the area Q-Bert can cover, shield and springs included"""
+        return sprite_area(self.x, self.y, self.size + 16)
+
+class Presenter:
+    def __init__(self, screen):
+        self.screen_rect = screen.get_rect()
+        self.rects = []  # Areas drawn this frame
+        self.last_rects = []  # Areas drawn last frame, which still show on the window
+        self.full = False  # Present the whole screen this frame
+        self.stale = True  # The window holds something the last rects don't describe
+        self.pixels_presented = 0  # Pixels copied to the window by the last present
+        self.full_frames = 0
+        self.partial_frames = 0
+    
+    def add(self, rect):
+        """Have an area drawn this frame presented"""
+        self.rects.append(rect)
+    
+    def add_all(self, rects):
+        """Have several areas drawn this frame presented"""
+        self.rects.extend(rects)
+    
+    def invalidate(self):
+        """Present the whole screen this frame, e.g. for a full-screen overlay or screen shake"""
+        self.full = True
+    
+    def present(self):
+        """Show the frame on the window, once per frame"""
+        # The frame after a full one goes out whole too, since what the
+        # window shows from it isn't covered by its rects
+        if self.full or self.stale:
+            pygame.display.flip()
+            self.pixels_presented = self.screen_rect.width * self.screen_rect.height
+            self.full_frames += 1
+        else:
+            # Last frame's areas go out as well, to clear what moved away from
+            # them; most things moved less than a pixel, so duplicates are dropped
+            rects = list({tuple(rect.clip(self.screen_rect)) for rect in self.last_rects + self.rects})
+            pygame.display.update(rects)
+            self.pixels_presented = sum(width * height for _, _, width, height in rects)
+            self.partial_frames += 1
+        
+        self.stale = self.full
+        self.full = False
+        self.last_rects = self.rects
+        self.rects = []
+    
+    def presented_fraction(self):
+        """Get the share of the screen copied to the window by the last present"""
+        return self.pixels_presented / (self.screen_rect.width * self.screen_rect.height)
 
 class Game:
     def __init__(self):
         # Game state
         self.game_state = "home"  # "home", "playing", or "high_score_entry"
+        self.show_debug = False  # F3 debug overlay
         self.home_screen = HomeScreen(SCREEN_WIDTH, SCREEN_HEIGHT)
         self.high_score_entry = None
         
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Q-Bert - Retro Arcade Experience")
+        self.presenter = Presenter(self.screen)
         self.clock = pygame.time.Clock()
         self.sound_generator = SoundGenerator()
         self.score = 0
@@ -2744,10 +4047,12 @@ class Game:
         # Visual effects systems
         self.particle_system = ParticleSystem()
         self.screen_shake = ScreenShake()
+        self.camera = Camera(SCREEN_WIDTH, SCREEN_HEIGHT)
         self.animated_background = AnimatedBackground(SCREEN_WIDTH, SCREEN_HEIGHT)
         
         # Audio system
         self.audio_manager = AudioManager(self.sound_generator)
+        self.audio_manager.start_warmup()
         
         # Progression system
         self.progression_system = ProgressionSystem()
@@ -2849,6 +4154,15 @@ class Game:
             
             pyramid.append(cube_row)
         
+        # Pitched effects for this level are ready before the first hop
+        self.sound_generator.preload_sfx_variants(self.level)
+        
+        # Only this level's cube sprites are needed from now on
+        cube_sprites.clear()
+        for cube_row in pyramid:
+            for cube in cube_row:
+                cube_sprites.build(cube)
+        pyramid_layer.reset(pyramid)
         return pyramid
     
     def update_pyramid_colors(self):
@@ -3093,6 +4407,7 @@ class Game:
             
             if moved:
                 self.qbert.last_move_time = current_time
+                self.qbert.move_event_time = self.sound_generator.latency.event_time
                 if result == True:
                     self.score += 25
     
@@ -3100,6 +4415,9 @@ class Game:
         """Draw everything on screen with visual effects"""
         # Get screen shake offset
         shake_x, shake_y = self.screen_shake.get_offset()
+        if shake_x or shake_y:
+            # Everything moves, so there are no dirty rects worth tracking
+            self.presenter.invalidate()
         
         # Dark background with animated elements
         self.screen.fill((5, 5, 15))  # Very dark blue background
@@ -3107,58 +4425,46 @@ class Game:
         # Draw animated background
         self.animated_background.draw(self.screen)
         
-        # Create a surface for the main game content (for screen shake)
-        game_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        # The game world is drawn where it is, and the camera shifts it
+        # as a whole for screen shake
+        self.camera.begin((shake_x, shake_y))
+        game_surface = self.camera.surface
         
-        # Draw pyramid on game surface
-        for row in self.pyramid:
-            for cube in row:
-                # Temporarily adjust cube position for screen shake
-                original_x, original_y = cube.x, cube.y
-                cube.x += shake_x
-                cube.y += shake_y
-                cube.draw(game_surface)
-                cube.x, cube.y = original_x, original_y
+        # Draw pyramid on game surface - only cubes that changed are redrawn
+        # into the layer
+        pyramid_layer.update(self.pyramid)
+        pyramid_layer.draw(game_surface)
         
         # Draw moving platforms on game surface
         for platform in self.moving_platforms:
-            original_x, original_y = platform.x, platform.y
-            platform.x += shake_x
-            platform.y += shake_y
-            platform.cube.x += shake_x
-            platform.cube.y += shake_y
             platform.draw(game_surface)
-            platform.x, platform.y = original_x, original_y
-            platform.cube.x, platform.cube.y = original_x, original_y
         
         # Draw Q-Bert on game surface
-        original_x, original_y = self.qbert.x, self.qbert.y
-        self.qbert.x += shake_x
-        self.qbert.y += shake_y
         self.qbert.draw(game_surface, self.particle_system)
-        self.qbert.x, self.qbert.y = original_x, original_y
         
         # Draw enemies on game surface
         for enemy in self.enemies:
-            original_x, original_y = enemy.x, enemy.y
-            enemy.x += shake_x
-            enemy.y += shake_y
             enemy.draw(game_surface, self.particle_system)
-            enemy.x, enemy.y = original_x, original_y
         
         # Draw power-ups on game surface
         for power_up in self.power_ups:
-            original_x, original_y = power_up.x, power_up.y
-            power_up.x += shake_x
-            power_up.y += shake_y
             power_up.draw(game_surface)
-            power_up.x, power_up.y = original_x, original_y
         
-        # Draw particles on game surface (they handle their own shake)
-        self.particle_system.draw(game_surface)
+        # Blit the game surface to the main screen, only as far as anything was drawn
+        sprite_rects = [platform.dirty_rect() for platform in self.moving_platforms]
+        sprite_rects.append(self.qbert.dirty_rect())
+        sprite_rects.extend(enemy.dirty_rect() for enemy in self.enemies)
+        sprite_rects.extend(power_up.dirty_rect() for power_up in self.power_ups)
+        self.camera.draw(self.screen, [pyramid_layer.bounds] + sprite_rects)
+        
+        # Draw particles on top, outside the camera - they don't shake
+        self.particle_system.draw(self.screen)
         
-        # Blit the game surface to the main screen
-        self.screen.blit(game_surface, (0, 0))
+        # Present only where something moved or animated
+        self.presenter.add_all(self.animated_background.dirty_rects())
+        self.presenter.add_all(pyramid_layer.take_changed_rects())
+        self.presenter.add_all(sprite_rects)
+        self.presenter.add_all(self.particle_system.dirty_rects())
         
         # Draw UI with neon colors
         font = pygame.font.Font(None, 36)
@@ -3184,30 +4490,30 @@ class Game:
         color_scheme = get_color_scheme(self.level, self.progression_system)
         theme_text = theme_font.render(f"Theme: {theme_name}", True, color_scheme['target_top'])
         
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(level_text, (10, 50))
-        self.screen.blit(lives_text, (10, 90))
-        self.screen.blit(theme_text, (10, 130))
+        self.presenter.add(self.screen.blit(score_text, (10, 10)))
+        self.presenter.add(self.screen.blit(level_text, (10, 50)))
+        self.presenter.add(self.screen.blit(lives_text, (10, 90)))
+        self.presenter.add(self.screen.blit(theme_text, (10, 130)))
         
         # Show high score
         high_scores = self.progression_system.get_high_scores()
         if high_scores:
             high_score_text = theme_font.render(f"High Score: {high_scores[0]['score']}", True, NEON_PINK)
-            self.screen.blit(high_score_text, (10, 160))
+            self.presenter.add(self.screen.blit(high_score_text, (10, 160)))
         
         # Draw active power-up status
         power_y = 190
         power_font = pygame.font.Font(None, 24)
         if self.qbert.active_powers:
             power_status_text = power_font.render("Active Powers:", True, WHITE)
-            self.screen.blit(power_status_text, (10, power_y))
+            self.presenter.add(self.screen.blit(power_status_text, (10, power_y)))
             power_y += 25
             
             current_time = pygame.time.get_ticks()
             for power, end_time in self.qbert.active_powers.items():
                 remaining = max(0, (end_time - current_time) // 1000)
                 power_text = power_font.render(f"{power.upper()}: {remaining}s", True, NEON_CYAN)
-                self.screen.blit(power_text, (10, power_y))
+                self.presenter.add(self.screen.blit(power_text, (10, power_y)))
                 power_y += 20
         
         # Show achievement notifications
@@ -3217,7 +4523,7 @@ class Game:
             
             for i, achievement in enumerate(self.newly_unlocked_achievements[-3:]):  # Show last 3
                 achievement_text = achievement_font.render(f"🏆 {achievement['name']} Unlocked!", True, NEON_PINK)
-                self.screen.blit(achievement_text, (10, achievement_y + i * 30))
+                self.presenter.add(self.screen.blit(achievement_text, (10, achievement_y + i * 30)))
         
         # Show statistics in corner
         stats = self.progression_system.get_statistics()
@@ -3232,7 +4538,7 @@ class Game:
         
         for i, stat in enumerate(stats_text):
             text = stats_font.render(stat, True, WHITE)
-            self.screen.blit(text, (SCREEN_WIDTH - 120, stats_y + i * 20))
+            self.presenter.add(self.screen.blit(text, (SCREEN_WIDTH - 120, stats_y + i * 20)))
         
         # Draw controls with neon styling
         controls_font = pygame.font.Font(None, 24)
@@ -3256,10 +4562,11 @@ class Game:
         colors = [ELECTRIC_BLUE] + [WHITE] * (len(controls) - 1)
         for i, (control, color) in enumerate(zip(controls, colors)):
             text = controls_font.render(control, True, color)
-            self.screen.blit(text, (SCREEN_WIDTH - 150, 10 + i * 25))
+            self.presenter.add(self.screen.blit(text, (SCREEN_WIDTH - 150, 10 + i * 25)))
         
         # Draw game over screen with neon effects
         if self.game_over:
+            self.presenter.invalidate()
             overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
             overlay.set_alpha(180)
             overlay.fill((5, 5, 15))  # Dark overlay
@@ -3315,20 +4622,67 @@ class Game:
                         True, NEON_CYAN
                     )
                     self.screen.blit(achievement_text, (SCREEN_WIDTH - 250, SCREEN_HEIGHT//2 + 130 + i * 20))
-        
-        pygame.display.flip()
+    
+    def draw_debug_overlay(self):
+        """Draw audio latency histograms and mixer statistics over the frame"""
+        font = pygame.font.Font(None, 20)
+        latency = self.sound_generator.latency
+        panel = pygame.Surface((300, 306))
+        panel.set_alpha(200)
+        panel.fill((5, 5, 15))
+        self.presenter.add(self.screen.blit(panel, (10, 284)))
+        
+        frequency = audio_backend.mixer_frequency()
+        lines = [
+            f"AUDIO  {type(audio_backend).__name__}  FPS {self.clock.get_fps():.0f}",
+            f"Buffer {MIXER_BUFFER_FRAMES} frames = {1000 * MIXER_BUFFER_FRAMES / frequency:.1f} ms",
+            f"Pitch variants {self.sound_generator.variant_hits} hits / {self.sound_generator.variant_misses} misses",
+            f"Presented {self.presenter.pixels_presented} px ({100 * self.presenter.presented_fraction():.0f}%)  "
+            f"full {self.presenter.full_frames} / partial {self.presenter.partial_frames}",
+            f"Particles {self.particle_system.count}  draw {self.particle_system.draw_ms:.2f} ms  "
+            f"stamps {100 * self.particle_system.stamp_hit_rate():.0f}% hit"
+        ]
+        voice_pool = self.audio_manager.voice_pool
+        if self.audio_manager.mixer_bus:
+            bus = self.audio_manager.mixer_bus
+            lines.append(f"Bus underruns {bus.underruns}  mix {bus.mix_cost_ms():.2f} ms/block")
+        elif voice_pool:
+            lines.append(f"Voices stolen {voice_pool.stolen}  dropped {voice_pool.dropped}")
+        for i, line in enumerate(lines):
+            self.presenter.add(self.screen.blit(font.render(line, True, NEON_CYAN), (18, 290 + i * 16)))
+        
+        # One bar chart per stage, bars scaled to the fullest bucket
+        labels = latency.bucket_labels()
+        y = 290 + len(lines) * 16 + 6
+        for stage, histogram in latency.stages.items():
+            counts = histogram['counts']
+            title = f"{latency.stage_title(stage)}  n={sum(counts)}  mean {latency.mean_ms(stage):.1f}  max {histogram['max_ms']:.1f} ms"
+            self.presenter.add(self.screen.blit(font.render(title, True, NEON_GREEN), (18, y)))
+            tallest = max(counts) or 1
+            for i, count in enumerate(counts):
+                height = int(24 * count / tallest)
+                pygame.draw.rect(self.screen, NEON_PINK, (18 + i * 34, y + 40 - height, 28, height))
+                self.presenter.add(self.screen.blit(font.render(labels[i], True, WHITE), (18 + i * 34, y + 42)))
+            y += 62
     
     def run(self):
         """Main game loop"""
         running = True
         
         while running:
+            # Pick up music rendered in the background
+            self.audio_manager.update()
+            
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
+                    elif event.key == pygame.K_F3:
+                        # Debug overlay, which also logs sound latency while it is open
+                        self.show_debug = not self.show_debug
+                        self.sound_generator.latency.log_enabled = self.show_debug or LATENCY_LOGGING
                     elif self.game_state == "home":
                         if event.key == pygame.K_s:  # Start game
                             print("Starting game...")  # Debug message
@@ -3354,8 +4708,10 @@ class Game:
                                     self.audio_manager.stop_all_music()
                     elif self.game_state == "playing":
                         if not self.game_over:
-                            # Pass the key event to handle_input
+                            # Pass the key event to handle_input, timing the sounds it sets off from now
+                            self.sound_generator.latency.mark_event()
                             self.handle_input(event)
+                            self.sound_generator.latency.clear_event()
                         elif self.game_over and event.key == pygame.K_r:
                             # Restart game
                             self.start_game()
@@ -3372,13 +4728,16 @@ class Game:
             
             # Update based on game state
             if self.game_state == "home":
+                self.home_screen.loading_progress = self.audio_manager.warmup_progress()
                 self.home_screen.update()
                 self.home_screen.draw(self.screen)
+                self.presenter.invalidate()
             
             elif self.game_state == "high_score_entry":
                 if self.high_score_entry:
                     self.high_score_entry.update()
                     self.high_score_entry.draw(self.screen)
+                self.presenter.invalidate()
             
             elif self.game_state == "playing" and self.qbert is not None:
                 if not self.game_over:
@@ -3413,8 +4772,10 @@ class Game:
                 self.spawn_power_up()
                 self.update_power_ups()
                 
-                # Check power-up collection
+                # Check power-up collection, timing its sound from the key press that moved Q-Bert there
+                self.sound_generator.latency.mark_event(self.qbert.move_event_time)
                 self.check_power_up_collection()
+                self.sound_generator.latency.clear_event()
                 
                 # Spawn enemies
                 self.spawn_enemy()
@@ -3444,11 +4805,14 @@ class Game:
                     # Check for newly unlocked achievements
                     self.newly_unlocked_achievements = self.progression_system.check_achievements()
                     
-                    # Play level complete fanfare
+                    # Play level complete fanfare, timed from the key press that finished the last cube
+                    self.sound_generator.latency.mark_event(self.qbert.move_event_time)
                     self.audio_manager.play_level_complete_fanfare()
+                    self.sound_generator.latency.clear_event()
                     
                     self.level += 1
                     self.pyramid = self.create_pyramid()  # Reset pyramid with new level colors
+                    self.presenter.invalidate()  # Colours and HUD change all over
                     self.qbert = QBert(0, 0, self.sound_generator)  # Reset Q-Bert position
                     self.qbert.update_position(self.pyramid)
                     self.enemies.clear()  # Clear enemies for new level
@@ -3468,9 +4832,16 @@ class Game:
                 if self.game_state == "playing":
                     self.draw()
             
-            pygame.display.flip()
+            if self.show_debug:
+                self.draw_debug_overlay()
+            
+            # The one present of the frame
+            self.presenter.present()
             self.clock.tick(60)  # 60 FPS
         
+        self.sound_generator.latency.close_log()
+        if NULL_AUDIO:
+            print(audio_backend.summary())
         pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import shutil
+import tracemalloc
+
+# Run headless - the drivers have to be chosen before pygame is imported.
+# With --null-audio, qbert skips the mixer entirely (it checks sys.argv).
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+import qbert
+import qbert_dsp
+
+# Benchmarks for the synthesis and particle code. Run with
+#
+#     python -m qbert_bench audio [--repeat N] [--output FILE] [--null-audio]
+#     python -m qbert_bench particles [--repeat N] [--output FILE]
+#
+# and diff the JSON files written for two commits.
+
+def peak_rss_mb():
+    """Get the peak resident set size of this process in MB, or None where it can't be read"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def audio_cases():
+    """List every SoundGenerator generator as (name, theme, call)"""
+    cases = [
+        ('tone', None, lambda g: g.generate_tone(440, 0.5)),
+        ('hop', None, lambda g: g.generate_hop_sound()),
+        ('cube_change', None, lambda g: g.generate_cube_change_sound()),
+        ('coily', None, lambda g: g.generate_coily_sound()),
+        ('power_up', None, lambda g: g.generate_power_up_sound()),
+        ('fanfare', None, lambda g: g.generate_level_complete_fanfare()),
+        ('ambient', None, lambda g: g.generate_ambient_atmosphere())
+    ]
+    for theme_num in qbert.MUSIC_THEMES:
+        cases.append(('background_music', theme_num, lambda g, level=theme_num: g.generate_background_music(level)))
+    return cases
+
+def fresh_generator(cache_dir):
+    """Make a SoundGenerator with nothing cached - on disk, on the generator or in the shared wavetables"""
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    qbert_dsp.wavetables.clear()
+    generator = qbert.SoundGenerator()
+    generator.cache = qbert.AudioCache(cache_dir=cache_dir)
+    return generator
+
+def case_peak_rss_mb(case_index):
+    """Render one audio case cold in this process and get its peak RSS - run in a fresh process"""
+    cache_dir = tempfile.mkdtemp(prefix="qbert_bench_")
+    generator = fresh_generator(cache_dir)
+    try:
+        # With no case, the peak is just the interpreter, pygame and the game module
+        if case_index is not None:
+            _, _, call = audio_cases()[case_index]
+            call(generator)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return peak_rss_mb()
+
+def isolated_peak_rss_mb(case_index):
+    """Get a case's peak RSS from a freshly spawned process, as ru_maxrss never falls within one"""
+    import concurrent.futures
+    import multiprocessing
+    
+    # Spawned, not forked - a forked child would start out with this process's peak
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(case_peak_rss_mb, case_index).result()
+
+def measure(call, cache_dir, repeat):
+    """Time a generator from a cold start and record its memory use"""
+    # Every run renders from scratch on a new generator, as on a first start
+    times = []
+    for _ in range(repeat):
+        generator = fresh_generator(cache_dir)
+        start = time.perf_counter()
+        sound = call(generator)
+        times.append(time.perf_counter() - start)
+    
+    # Memory is measured on a separate run so tracing doesn't skew the timings
+    generator = fresh_generator(cache_dir)
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    sound = call(generator)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    samples = len(qbert.audio_backend.sound_array(sound)) if sound else 0
+    del sound
+    return {
+        'best_seconds': min(times),
+        'mean_seconds': sum(times) / len(times),
+        'samples': samples,
+        'samples_per_second': samples / min(times) if min(times) > 0 else None,
+        'peak_alloc_bytes': peak_bytes,
+        'net_allocated_blocks': sys.getallocatedblocks() - blocks_before
+    }
+
+def run_audio(repeat):
+    """Benchmark every generator and theme"""
+    generator = qbert.SoundGenerator()
+    if not generator.audio_available:
+        raise SystemExit("Audio is not available - cannot benchmark synthesis")
+    
+    cache_dir = tempfile.mkdtemp(prefix="qbert_bench_")
+    
+    results = []
+    try:
+        for case_index, (name, theme, call) in enumerate(audio_cases()):
+            result = {'name': name, 'theme': theme}
+            result.update(measure(call, cache_dir, repeat))
+            result['peak_rss_mb'] = isolated_peak_rss_mb(case_index)
+            results.append(result)
+        baseline_rss = isolated_peak_rss_mb(None)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return {
+        'suite': 'audio',
+        'sample_rate': generator.sample_rate,
+        'generator_version': qbert.AUDIO_GENERATOR_VERSION,
+        'repeat': repeat,
+        'baseline_rss_mb': baseline_rss,
+        'results': results
+    }
+
+def print_audio_report(report):
+    """Print a benchmark report as a table"""
+    # RSS is the peak of a fresh process rendering only that case
+    print(f"{'generator':<22}{'best ms':>10}{'mean ms':>10}{'Msamples/s':>12}{'peak MB':>10}{'net blk':>8}{'RSS MB':>9}")
+    for result in report['results']:
+        name = result['name'] if result['theme'] is None else f"{result['name']} {result['theme']}"
+        rate = result['samples_per_second'] or 0
+        rss = result['peak_rss_mb'] or 0
+        print(f"{name:<22}{result['best_seconds'] * 1000:>10.2f}{result['mean_seconds'] * 1000:>10.2f}"
+              f"{rate / 1e6:>12.2f}{result['peak_alloc_bytes'] / 1e6:>10.2f}"
+              f"{result['net_allocated_blocks']:>8}{rss:>9.1f}")
+    print(f"{'(no case)':<22}{'':>50}{report['baseline_rss_mb'] or 0:>9.1f}")
+
+# Live particle counts to time, up to about a full pool
+PARTICLE_COUNTS = (100, 1000, 4000)
+PARTICLE_FRAMES = 10  # Frames timed per run, short enough that no particle burns out
+
+def run_particles(repeat):
+    """Time particle updates and drawing at several particle counts"""
+    surface = pygame.Surface((qbert.SCREEN_WIDTH, qbert.SCREEN_HEIGHT))
+    results = []
+    for count in PARTICLE_COUNTS:
+        update_times = []
+        draw_times = []
+        for _ in range(repeat):
+            system = qbert.ParticleSystem()
+            system.add_explosion(qbert.SCREEN_WIDTH // 2, qbert.SCREEN_HEIGHT // 2, qbert.NEON_PINK, count)
+            for _ in range(PARTICLE_FRAMES):
+                start = time.perf_counter()
+                system.update()
+                update_times.append(time.perf_counter() - start)
+                
+                start = time.perf_counter()
+                system.draw(surface)
+                draw_times.append(time.perf_counter() - start)
+        results.append({
+            'particles': count,
+            'update_best_seconds': min(update_times),
+            'update_mean_seconds': sum(update_times) / len(update_times),
+            'draw_best_seconds': min(draw_times),
+            'draw_mean_seconds': sum(draw_times) / len(draw_times)
+        })
+    return {
+        'suite': 'particles',
+        'repeat': repeat,
+        'frames': PARTICLE_FRAMES,
+        'results': results
+    }
+
+def print_particles_report(report):
+    """Print a particle benchmark report as a table"""
+    print(f"{'particles':>10}{'update ms':>11}{'mean ms':>10}{'draw ms':>10}{'mean ms':>10}")
+    for result in report['results']:
+        print(f"{result['particles']:>10}{result['update_best_seconds'] * 1000:>11.3f}{result['update_mean_seconds'] * 1000:>10.3f}"
+              f"{result['draw_best_seconds'] * 1000:>10.2f}{result['draw_mean_seconds'] * 1000:>10.2f}")
+
+SUITES = {
+    'audio': (run_audio, print_audio_report),
+    'particles': (run_particles, print_particles_report)
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m qbert_bench", description="Q-Bert performance benchmarks")
+    parser.add_argument('suite', choices=sorted(SUITES), help="benchmark suite to run")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per case (best and mean are reported)")
+    parser.add_argument('--output', help="JSON result file (default: qbert_bench_<suite>.json)")
+    parser.add_argument('--null-audio', action='store_true', help="synthesize without opening the mixer")
+    args = parser.parse_args(argv)
+    
+    run, print_report = SUITES[args.suite]
+    report = run(args.repeat)
+    report.update({
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pygame': pygame.version.ver,
+        'platform': sys.platform,
+        'audio_backend': type(qbert.audio_backend).__name__,
+        'cpu_count': os.cpu_count()
+    })
+    
+    print_report(report)
+    output = args.output or f"qbert_bench_{args.suite}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import numpy as np
+
+# Wavetable length - a power of two so table positions wrap with a bit mask
+WAVETABLE_SIZE = 2048
+
+# Signals are mono float32: plenty for 16-bit output at half the memory of
+# float64. Oscillator phases stay float64, since a long track's phase needs
+# the extra digits to stay in tune.
+SAMPLE_DTYPE = np.float32
+
+# Vectorized building blocks for SoundGenerator. Every function works on
+# whole NumPy arrays of samples, so an effect costs a handful of array
+# operations instead of one Python iteration per sample. The effect classes
+# at the bottom keep their state between blocks, so a track can be processed
+# in one go or streamed block by block with the same result.
+
+def time_axis(frames, start_frame=0):
+    """Get the absolute frame index of every sample in a block"""
+    return np.arange(start_frame, start_frame + frames)
+
+def accumulate_phase(freq, frames, sample_rate, phase=0.0):
+    """Accumulate oscillator phase in radians for a constant or per-sample frequency"""
+    if np.isscalar(freq):
+        return phase + 2 * np.pi * freq * time_axis(frames) / sample_rate
+
+    if frames == 0:
+        return np.empty(0)
+    
+    # Phase advances by the frequency of the previous sample, so the first sample starts at `phase`
+    steps = np.empty(frames)
+    steps[0] = 0.0
+    np.cumsum(freq[:-1], out=steps[1:])
+    return phase + 2 * np.pi * steps / sample_rate
+
+def waveform(phase, shape='sine'):
+    """Evaluate a waveform shape at the given phases"""
+    out = np.empty(np.shape(phase), dtype=SAMPLE_DTYPE)
+    if shape == 'sine':
+        return np.sin(phase, out=out)
+    elif shape == 'square':
+        np.sin(phase, out=out)
+        return np.sign(out, out=out)
+    elif shape in ('saw', 'triangle'):
+        # Position within the cycle, rescaled to -1..1
+        np.remainder(phase / (2 * np.pi), 1.0, out=out)
+        out *= 2
+        out -= 1
+        if shape == 'triangle':
+            np.abs(out, out=out)
+            out *= 2
+            out -= 1
+        return out
+    raise ValueError(f"Unknown waveform shape: {shape}")
+
+# Built tables and their slopes, keyed by (shape, harmonics)
+wavetables = {}
+
+def band_limit(freq, sample_rate):
+    """Number of harmonics of the highest frequency that fit below Nyquist"""
+    return max(1, int(sample_rate / 2 / np.max(freq)))
+
+def band_limited_table(shape, harmonics):
+    """Get one cycle of a band-limited waveform and the slope between its entries"""
+    if shape == 'sine':
+        harmonics = 1
+    # Round down to a power of two so only a handful of tables ever get built
+    harmonics = 1 << (int(harmonics).bit_length() - 1)
+    
+    key = (shape, harmonics)
+    if key not in wavetables:
+        x = 2 * np.pi * np.arange(WAVETABLE_SIZE) / WAVETABLE_SIZE
+        n = np.arange(1, harmonics + 1)
+        if shape == 'sine':
+            table = np.sin(x)
+        elif shape == 'square':
+            n = n[n % 2 == 1]
+            table = (4 / np.pi) * np.sin(np.outer(x, n)) @ (1.0 / n)
+        elif shape == 'saw':
+            table = -(2 / np.pi) * np.sin(np.outer(x, n)) @ (1.0 / n)
+        elif shape == 'triangle':
+            n = n[n % 2 == 1]
+            table = (8 / np.pi ** 2) * np.cos(np.outer(x, n)) @ (1.0 / n ** 2)
+        else:
+            raise ValueError(f"Unknown waveform shape: {shape}")
+        table = table.astype(SAMPLE_DTYPE)
+        wavetables[key] = (table, np.roll(table, -1) - table)
+    return wavetables[key]
+
+def wavetable_waveform(phase, shape='sine', harmonics=1):
+    """Read a waveform from its wavetable at non-negative phases, interpolating linearly"""
+    table, slope = band_limited_table(shape, harmonics)
+    position = phase * (WAVETABLE_SIZE / (2 * np.pi))
+    index = position.astype(np.intp)
+    out = np.subtract(position, index, out=np.empty(len(position), dtype=SAMPLE_DTYPE))
+    index &= WAVETABLE_SIZE - 1
+    out *= slope.take(index)
+    out += table.take(index)
+    return out
+
+def oscillator(freq, frames, sample_rate, shape='sine', phase=0.0, wavetable=False):
+    """Phase-accumulating oscillator for a constant or per-sample frequency"""
+    phases = accumulate_phase(freq, frames, sample_rate, phase)
+    if wavetable:
+        return wavetable_waveform(phases, shape, band_limit(freq, sample_rate))
+    return waveform(phases, shape)
+
+def chirp(start_freq, end_freq, frames, sample_rate, shape='sine', wavetable=False):
+    """Oscillator sweeping linearly from one frequency to another"""
+    return oscillator(ramp(frames, start_freq, end_freq), frames, sample_rate, shape, wavetable=wavetable)
+
+def note_sequence(notes, sample_rate):
+    """Expand (frequency, duration) pairs into a per-sample frequency array"""
+    return np.concatenate([np.full(int(duration * sample_rate), float(freq)) for freq, duration in notes])
+
+def ramp(frames, start, end):
+    """Straight line from start towards end, reaching end one sample after the block"""
+    line = np.arange(frames, dtype=SAMPLE_DTYPE)
+    line *= (end - start) / frames
+    line += start
+    return line
+
+def envelope(frames, points):
+    """Piecewise-linear envelope through (progress, level) points, progress from 0 to 1"""
+    progress = time_axis(frames) / frames
+    positions, levels = zip(*points)
+    return np.interp(progress, positions, levels).astype(SAMPLE_DTYPE)
+
+def adsr(frames, attack, decay, sustain, release=0.0):
+    """Attack/decay/sustain/release envelope with stage lengths as fractions of the block"""
+    points = [(0.0, 0.0), (attack, 1.0), (attack + decay, sustain)]
+    if release > 0:
+        points += [(1.0 - release, sustain), (1.0, 0.0)]
+    return envelope(frames, points)
+
+def noise(frames, amplitude=1.0, rng=None):
+    """Uniform white noise between -amplitude and +amplitude"""
+    rng = rng or np.random
+    out = rng.random(frames).astype(SAMPLE_DTYPE)
+    out -= 0.5
+    out *= 2 * amplitude
+    return out
+
+def mix(*layers):
+    """Sum equal-length signals into one"""
+    total = np.zeros(len(layers[0]), dtype=SAMPLE_DTYPE)
+    for layer in layers:
+        total += layer
+    return total
+
+def resample(samples, ratio):
+    """Play a signal back `ratio` times as fast by linear interpolation - higher and shorter for ratios above 1"""
+    positions = np.arange(0, len(samples) - 1, ratio)
+    return np.interp(positions, time_axis(len(samples)), samples).astype(SAMPLE_DTYPE)
+
+def pan_gains(pan):
+    """Left and right gains for a pan position from -1 (left) to 1 (right), both 1 at centre"""
+    return min(1.0, 1.0 - pan), min(1.0, 1.0 + pan)
+
+def to_int16(mono):
+    """Scale a -1..1 mono signal to clipped int16 stereo samples for the mixer, reusing its buffer"""
+    mono *= 32767
+    np.clip(mono, -32767, 32767, out=mono)
+    
+    # Stereo only exists at the very end, as two copies of the mono samples
+    stereo = np.empty((len(mono), 2), dtype=np.int16)
+    stereo[:, 0] = mono
+    stereo[:, 1] = mono
+    return stereo
+
+class FeedbackDelay:
+    def __init__(self, delay, feedback, onset=None):
+        self.delay = delay
+        self.feedback = feedback
+        self.onset = delay + 1 if onset is None else onset  # First frame of the track that gets an echo
+        self.history = np.zeros(delay, dtype=SAMPLE_DTYPE)  # Last `delay` output samples
+    
+    def reset(self):
+        """Forget the echo tail, e.g. when a looping track starts over"""
+        self.history = np.zeros(self.delay, dtype=SAMPLE_DTYPE)
+    
+    def process(self, block, start_frame):
+        """Echo one block that continues the previous one: y[n] = x[n] + feedback * y[n - delay]"""
+        delay = self.delay
+        buffer = np.concatenate((self.history, block))
+        
+        # Each sample feeds back from one delay earlier, so a chunk no longer
+        # than the delay only reads samples that are already final
+        first_wet = delay + max(0, self.onset - start_frame)
+        for chunk_start in range(first_wet, len(buffer), delay):
+            chunk_end = min(chunk_start + delay, len(buffer))
+            buffer[chunk_start:chunk_end] += buffer[chunk_start - delay:chunk_end - delay] * self.feedback
+        
+        self.history = buffer[-delay:].copy()
+        return buffer[delay:]
+
+class EffectsStage:
+    def __init__(self, modulation, delay):
+        self.modulation = modulation  # Gain curve over the whole track
+        self.delay = delay
+        self.position = 0
+    
+    def reset(self):
+        """Rewind to the start of the track"""
+        self.position = 0
+        self.delay.reset()
+    
+    def process(self, block):
+        """Run the next block of a dry mix through the modulation curve and the delay"""
+        start_frame = self.position
+        self.position += len(block)
+        wet = block * self.modulation[start_frame:self.position]
+        return self.delay.process(wet, start_frame)